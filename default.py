@@ -5,20 +5,25 @@
 # --- Python standard library ---
 from __future__ import unicode_literals
 from __future__ import division
+from __future__ import annotations
 
 import sys
 import logging
+import typing
     
 # --- Kodi stuff ---
 import xbmcaddon
 
 # AKL main imports
-from akl import constants, addons
-from akl.utils import kodilogging, io, kodi
-from akl.scrapers import ScraperSettings, ScrapeStrategy
+# Kodi starts a new interpreter for every call of the addon. Only what every call needs is
+# imported here, the akl scraper stack and the scraper itself are imported by the code paths
+# which use them.
+from akl.utils import kodilogging, kodi
 
-# Local modules
-from resources.lib.scraper import SteamGridDB
+if typing.TYPE_CHECKING:
+    from akl import addons
+    from akl.scrapers import ScrapeStrategy
+    from resources.lib.scraper import SteamGridDB
 
 kodilogging.config() 
 logger = logging.getLogger(__name__)
@@ -33,18 +38,22 @@ addon_version = addon.getAddonInfo('version')
 # This is the plugin entry point.
 # ---------------------------------------------------------------------------------------------
 def run_plugin():
-    os_name = io.is_which_os()
-    
     # --- Some debug stuff for development ---
     logger.info('------------ Called Advanced Kodi Launcher Plugin: SteamGrid DB Scraper ------------')
-    logger.info(f'addon.id         "{addon_id}"')
     logger.info(f'addon.version    "{addon_version}"')
-    logger.info(f'sys.platform     "{sys.platform}"')
-    logger.info(f'OS               "{os_name}"')
+    if logger.isEnabledFor(logging.DEBUG):
+        from akl.utils import io
+        logger.debug(f'addon.id         "{addon_id}"')
+        logger.debug(f'sys.platform     "{sys.platform}"')
+        logger.debug(f'OS               "{io.is_which_os()}"')
+        for i in range(len(sys.argv)):
+            logger.debug(f'sys.argv[{i}] "{sys.argv[i]}"')
 
-    for i in range(len(sys.argv)):
-        logger.info(f'sys.argv[{i}] "{sys.argv[i]}"')
+    if len(sys.argv) > 1 and sys.argv[1] in SETTINGS_ACTIONS:
+        SETTINGS_ACTIONS[sys.argv[1]]()
+        return
 
+    from akl import addons
     addon_args = addons.AklAddonArguments('script.akl.defaults')
     try:
         addon_args.parse()
@@ -65,15 +74,23 @@ def run_plugin():
 # Scraper methods.
 # ---------------------------------------------------------------------------------------------
 def run_scraper(args: addons.AklAddonArguments):
+    from akl import constants
+    from akl.scrapers import ScraperSettings, ScrapeStrategy
+    from resources.lib.scraper import SteamGridDB
+
     logger.debug('========== run_scraper() BEGIN ==================================================')
     pdialog = kodi.ProgressDialog()
     
     settings = ScraperSettings.from_settings_dict(args.get_settings())
+    scraper = SteamGridDB()
+    scraper.set_progress_dialog(pdialog)
+    scraper.set_manual_selection(settings.game_selection_mode == constants.SCRAPE_MANUAL)
+    scraper.set_scrape_settings(args.get_settings())
     scraper_strategy = ScrapeStrategy(
         args.get_webserver_host(),
         args.get_webserver_port(),
         settings,
-        SteamGridDB(),
+        scraper,
         pdialog)
     
     if args.get_entity_type() == constants.OBJ_ROM:
@@ -83,14 +100,164 @@ def run_scraper(args: addons.AklAddonArguments):
         scraper_strategy.store_scraped_rom(args.get_akl_addon_id(), args.get_entity_id(), scraped_rom)
         pdialog.endProgress()
     else:
-        scraped_roms = scraper_strategy.process_roms(args.get_entity_type(), args.get_entity_id())
-        pdialog.endProgress()
-        pdialog.startProgress('Saving ROMs in database ...')
+        # The ROM list is only needed to stream, i.e. for incremental rescans or batched saving,
+        # and to prefetch. process_roms() gets it on its own.
+        is_streamed = scraper.incremental_rescan or scraper.store_batch_size > 0
+        roms = get_roms_to_scrape(args) if is_streamed or scraper.prefetch_depth > 0 else None
+        if is_streamed and roms is not None:
+            store_roms_in_batches(args, scraper, scraper_strategy, pdialog, roms)
+        else:
+            if is_streamed:
+                logger.warning('run_scraper() Without the ROM list incremental rescans and batched saving are off. '
+                               'Scraping all ROMs and saving them at the end.')
+            scraper.start_prefetch(roms, pdialog)
+            try:
+                scraped_roms = scraper_strategy.process_roms(args.get_entity_type(), args.get_entity_id())
+            finally:
+                scraper.stop_prefetch()
+            pdialog.endProgress()
+            pdialog.startProgress('Saving ROMs in database ...')
+            scraper_strategy.store_scraped_roms(args.get_akl_addon_id(),
+                                                args.get_entity_type(),
+                                                args.get_entity_id(),
+                                                scraped_roms)
+            pdialog.endProgress()
+    scraper.dump_metrics()
+
+
+# Streamed scrape. The ROMs are saved in AKL in batches of store_batch_size while the scrape
+# runs, or all at the end with a batch size of 0, so the scraped ROMs are never kept in memory
+# all together. Every saved batch is committed to the checkpoint of the collection or source,
+# so a canceled or crashed scrape continues after the last saved batch on the next run.
+def store_roms_in_batches(args: addons.AklAddonArguments, scraper: SteamGridDB,
+                          scraper_strategy: ScrapeStrategy, pdialog: kodi.ProgressDialog, roms: list):
+    checkpoint = scraper.get_checkpoint(args.get_entity_type(), args.get_entity_id())
+    if len(checkpoint) > 0:
+        roms = [rom for rom in roms if rom.get_id() not in checkpoint]
+        logger.info('store_roms_in_batches() Resuming after {} saved ROMs'.format(len(checkpoint)))
+    batch_size = scraper.store_batch_size if scraper.store_batch_size > 0 else len(roms)
+
+    def store_batch(batch: list):
+        logger.debug('store_roms_in_batches() Saving {} ROMs'.format(len(batch)))
         scraper_strategy.store_scraped_roms(args.get_akl_addon_id(),
                                             args.get_entity_type(),
                                             args.get_entity_id(),
-                                            scraped_roms)
+                                            batch)
+        scraper.commit_scraped_roms()
+        scraper.flush_disk_cache()
+        checkpoint.commit([rom.get_id() for rom in batch])
+
+    batch = []
+    scraped_roms = iter_scraped_roms(scraper, scraper_strategy, pdialog, roms)
+    try:
+        for scraped_rom in scraped_roms:
+            batch.append(scraped_rom)
+            if len(batch) >= batch_size:
+                store_batch(batch)
+                batch = []
+    finally:
+        scraped_roms.close()
+        scraper.flush_disk_cache()
+    # Starting the progress again resets the canceled state of the dialog.
+    canceled = pdialog.isCanceled()
+    pdialog.endProgress()
+    if batch:
+        pdialog.startProgress('Saving ROMs in database ...')
+        store_batch(batch)
         pdialog.endProgress()
+    if canceled:
+        logger.info('store_roms_in_batches() Canceled. Next run resumes after {} saved ROMs'.format(len(checkpoint)))
+        return
+    checkpoint.clear()
+
+
+# Yields the ROMs as they are scraped. With incremental rescans only the ROMs which are new or
+# of which the SteamGridDB assets changed since the previous scan are scraped, see
+# SteamGridDB.is_rom_up_to_date().
+def iter_scraped_roms(scraper: SteamGridDB, scraper_strategy: ScrapeStrategy,
+                      pdialog: kodi.ProgressDialog, roms: list):
+    if scraper.incremental_rescan:
+        changed_roms = [rom for rom in roms if not scraper.is_rom_up_to_date(rom)]
+        logger.info('iter_scraped_roms() {} of {} ROMs are up to date'.format(
+            len(roms) - len(changed_roms), len(roms)))
+        roms = changed_roms
+
+    scraper.start_prefetch(roms, pdialog)
+    try:
+        for rom in roms:
+            if pdialog.isCanceled(): return
+            scraped_rom = scraper_strategy.process_single_rom(rom.get_id())
+            scraper.record_scraped_rom(scraped_rom)
+            yield scraped_rom
+    finally:
+        scraper.stop_prefetch()
+
+
+# Returns the ROMs of the collection or source being scraped, in the order ScrapeStrategy
+# processes them, or None when the webserver cannot be asked. The caller then falls back to
+# ScrapeStrategy.process_roms() without prefetching.
+def get_roms_to_scrape(args: addons.AklAddonArguments) -> list:
+    from akl import constants, api
+    try:
+        if args.get_entity_type() == constants.OBJ_SOURCE:
+            return api.client_get_roms_in_source(
+                args.get_webserver_host(), args.get_webserver_port(), args.get_entity_id())
+        return api.client_get_roms_in_collection(
+            args.get_webserver_host(), args.get_webserver_port(), args.get_entity_id())
+    except Exception as ex:
+        logger.warning('get_roms_to_scrape() Cannot get the ROMs of the collection or source. '
+                       'Scraping without prefetch.', exc_info=ex)
+        return None
+
+
+# ---------------------------------------------------------------------------------------------
+# Actions of the addon settings, called with RunScript(script.akl.steamgriddb,<action>).
+# ---------------------------------------------------------------------------------------------
+def export_title_index():
+    import xbmcgui
+    from akl.utils import io
+    from resources.lib.scraper import SteamGridDB
+
+    folder = xbmcgui.Dialog().browse(3, 'Export title index to', 'files')
+    if not folder: return
+    file_path = io.FileName(folder).pjoin('SteamGridDB_titles_export.json')
+    try:
+        num_titles = SteamGridDB().export_title_index(file_path.getPathTranslated())
+    except OSError as ex:
+        logger.error('Cannot export title index', exc_info=ex)
+        kodi.notify_error('Cannot export title index')
+        return
+    kodi.notify('Exported {} titles'.format(num_titles))
+
+
+def import_title_index():
+    import xbmcgui
+    from akl.utils import io
+    from resources.lib.scraper import SteamGridDB
+
+    file_path = xbmcgui.Dialog().browse(1, 'Import title index', 'files', '.json')
+    if not file_path: return
+    try:
+        num_titles = SteamGridDB().import_title_index(io.FileName(file_path).getPathTranslated())
+    except (OSError, ValueError) as ex:
+        logger.error('Cannot import title index', exc_info=ex)
+        kodi.notify_error('Cannot import title index')
+        return
+    kodi.notify('Imported {} titles'.format(num_titles))
+
+
+def purge_negative_cache():
+    from resources.lib.scraper import SteamGridDB
+
+    num_entries = SteamGridDB().purge_negative_cache()
+    kodi.notify('Forgot {} games not found'.format(num_entries))
+
+
+SETTINGS_ACTIONS = {
+    'export_title_index': export_title_index,
+    'import_title_index': import_title_index,
+    'purge_negative_cache': purge_negative_cache
+}
 
 
 # ---------------------------------------------------------------------------------------------
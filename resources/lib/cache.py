@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# In memory caches for the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# ------------------------------------------------------------------------------------------------
+# Thread safe LRU cache bounded by number of entries and by (estimated) size in bytes.
+# The size of an entry is the length of its JSON representation, which is also what the
+# entry costs in the disk cache. Entries bigger than the byte limit are not cached.
+# ------------------------------------------------------------------------------------------------
+class LRUCache(object):
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Returns the cached value and counts a hit or a miss.
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self.entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Returns the cached value without touching the statistics or the LRU order.
+    def peek(self, key, default=None):
+        with self._lock:
+            entry = self.entries.get(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def put(self, key, value):
+        if self.max_entries <= 0: return
+        size = len(json.dumps(value))
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes: return
+            self.entries[key] = (value, size)
+            self.size_bytes += size
+            while len(self.entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                oldest_key = next(iter(self.entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, _MISSING)
+        if entry is not _MISSING:
+            self.size_bytes -= entry[1]
+
+
+# ------------------------------------------------------------------------------------------------
+# Lets concurrent lookups of the same key share one fetch. The first caller runs the fetch
+# function, callers arriving while it runs wait for and receive the same result.
+# ------------------------------------------------------------------------------------------------
+class RequestCoalescer(object):
+    def __init__(self):
+        self.in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fetch_function):
+        with self._lock:
+            future = self.in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not is_owner:
+            logger.debug('RequestCoalescer.run() Joining in-flight request "{}"'.format(key))
+            return future.result()
+
+        try:
+            result = fetch_function()
+            future.set_result(result)
+            return result
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        finally:
+            with self._lock:
+                del self.in_flight[key]
+
+
+# ------------------------------------------------------------------------------------------------
+# Persistent cache stored in a single JSON file. The whole file is loaded on the first use of
+# the cache, so lookups never touch the disk and calls which never use it don't read it.
+# Entries expire 'ttl' seconds after they were stored and the oldest entries are dropped when
+# there are more than 'max_entries'. A ttl or max_entries of 0 means no limit.
+# Changes are written back with flush().
+# ------------------------------------------------------------------------------------------------
+class JsonFileCache(object):
+    def __init__(self, file_path: str, ttl: float, max_entries: int, clock=time.time):
+        self.file_path = file_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.dirty = False
+        self._entries = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self.entries)
+
+    # Loaded on first access. Only used with the lock held.
+    @property
+    def entries(self) -> dict:
+        if self._entries is None: self._load()
+        return self._entries
+
+    @entries.setter
+    def entries(self, entries: dict):
+        self._entries = entries
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            if self._is_expired(entry):
+                del self.entries[key]
+                self.dirty = True
+                return default
+            return entry['data']
+
+    # Returns (data, timestamp) of an entry, also when it is expired, or None.
+    def get_entry(self, key: str):
+        with self._lock:
+            entry = self.entries.get(key)
+            return None if entry is None else (entry['data'], entry['timestamp'])
+
+    # Returns all (key, data) pairs, also the expired ones.
+    def items(self) -> list:
+        with self._lock:
+            return [(key, entry['data']) for key, entry in self.entries.items()]
+
+    def put(self, key: str, data):
+        with self._lock:
+            self.entries[key] = {'data': data, 'timestamp': self._clock()}
+            self.dirty = True
+
+    def delete(self, key: str):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self.dirty = True
+
+    def purge(self):
+        with self._lock:
+            self.entries = {}
+            self.dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self.dirty: return
+            self.entries = {key: entry for key, entry in self.entries.items() if not self._is_expired(entry)}
+            if self.max_entries > 0 and len(self.entries) > self.max_entries:
+                newest_keys = sorted(self.entries, key=lambda key: self.entries[key]['timestamp'], reverse=True)
+                self.entries = {key: self.entries[key] for key in newest_keys[:self.max_entries]}
+
+            temp_path = '{}.tmp'.format(self.file_path)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.file_path)
+            self.dirty = False
+            logger.debug('JsonFileCache.flush() Saved {} entries in "{}"'.format(len(self.entries), self.file_path))
+
+    def _load(self):
+        self._entries = {}
+        if not os.path.exists(self.file_path): return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as ex:
+            logger.error('JsonFileCache._load() Cannot load "{}". Starting empty.'.format(self.file_path), exc_info=ex)
+            self.entries = {}
+        logger.debug('JsonFileCache._load() Loaded {} entries from "{}"'.format(len(self.entries), self.file_path))
+
+    def _is_expired(self, entry) -> bool:
+        return self.ttl > 0 and self._clock() - entry['timestamp'] > self.ttl
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Resume checkpoint of a scrape of a collection or source.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# Remembers which ROMs of a collection or source are scraped and saved in AKL. Every saved
+# batch is committed to the checkpoint file right away, so a scrape which is canceled or
+# crashes continues with the ROMs after the last saved batch on the next run. The checkpoint
+# of a scrape which finished is cleared. The file holds the checkpoints of all collections
+# and sources, keyed by entity type and ID.
+# ------------------------------------------------------------------------------------------------
+class ScrapeCheckpoint(object):
+    def __init__(self, file_path: str, entity_type: str, entity_id: str):
+        self.file_path = file_path
+        self.key = '{}/{}'.format(entity_type, entity_id)
+        self.checkpoints = self._load()
+        self.rom_ids = set(self.checkpoints.get(self.key, []))
+
+    def __contains__(self, rom_id):
+        return str(rom_id) in self.rom_ids
+
+    def __len__(self):
+        return len(self.rom_ids)
+
+    def commit(self, rom_ids: list):
+        self.rom_ids.update(str(rom_id) for rom_id in rom_ids)
+        self.checkpoints[self.key] = sorted(self.rom_ids)
+        self._save()
+
+    def clear(self):
+        self.rom_ids = set()
+        if self.checkpoints.pop(self.key, None) is not None:
+            self._save()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.file_path): return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as ex:
+            logger.error('ScrapeCheckpoint._load() Cannot load "{}". Starting over.'.format(self.file_path), exc_info=ex)
+            return {}
+
+    def _save(self):
+        temp_path = '{}.tmp'.format(self.file_path)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoints, f)
+        os.replace(temp_path, self.file_path)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Filters of the images returned by the SteamGridDB grids, heroes and logos endpoints.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Values of the NSFW and humor settings.
+FILTER_ANY = 0
+FILTER_EXCLUDE = 1
+FILTER_ONLY = 2
+_FILTER_QUERY_VALUES = {FILTER_ANY: 'any', FILTER_EXCLUDE: 'false', FILTER_ONLY: 'true'}
+# Query values SteamGridDB uses when the parameter is not sent.
+_DEFAULT_NSFW = FILTER_EXCLUDE
+_DEFAULT_HUMOR = FILTER_ANY
+
+
+# Splits a comma separated setting like "alternate, material" into a list of lower case values.
+def parse_filter_list(value: str) -> list:
+    if not value: return []
+    return [item.strip().lower() for item in value.split(',') if item.strip()]
+
+
+# ------------------------------------------------------------------------------------------------
+# Image filter of one asset endpoint. The filter is sent along as query parameters so
+# SteamGridDB returns less images, and checked again for every image of the response because
+# not every endpoint supports every parameter. Empty lists and FILTER_ANY accept everything,
+# a limit of 0 means no limit.
+# ------------------------------------------------------------------------------------------------
+class AssetFilter(object):
+    def __init__(self, styles: list = None, dimensions: list = None, mimes: list = None,
+                 nsfw: int = _DEFAULT_NSFW, humor: int = _DEFAULT_HUMOR, limit: int = 0):
+        self.styles = styles or []
+        self.dimensions = dimensions or []
+        self.mimes = mimes or []
+        self.nsfw = nsfw
+        self.humor = humor
+        self.limit = limit
+
+    # Query parameters of the filter. Parameters with the SteamGridDB default are left out,
+    # so unfiltered requests keep their plain URL.
+    def get_query_params(self) -> dict:
+        params = {}
+        if self.styles: params['styles'] = ','.join(self.styles)
+        if self.dimensions: params['dimensions'] = ','.join(self.dimensions)
+        if self.mimes: params['mimes'] = ','.join(self.mimes)
+        if self.nsfw != _DEFAULT_NSFW: params['nsfw'] = _FILTER_QUERY_VALUES[self.nsfw]
+        if self.humor != _DEFAULT_HUMOR: params['humor'] = _FILTER_QUERY_VALUES[self.humor]
+        if self.limit > 0: params['limit'] = self.limit
+        return params
+
+    def accepts(self, image_data: dict) -> bool:
+        if self.styles and str(image_data.get('style', '')).lower() not in self.styles: return False
+        if self.dimensions and \
+                '{}x{}'.format(image_data.get('width'), image_data.get('height')) not in self.dimensions:
+            return False
+        if self.mimes and str(image_data.get('mime', '')).lower() not in self.mimes: return False
+        if not self._accepts_flag(self.nsfw, image_data.get('nsfw', False)): return False
+        if not self._accepts_flag(self.humor, image_data.get('humor', False)): return False
+        return True
+
+    def _accepts_flag(self, filter_value: int, flag: bool) -> bool:
+        if filter_value == FILTER_EXCLUDE: return not flag
+        if filter_value == FILTER_ONLY: return bool(flag)
+        return True
+
+
+# Short signature of a set of filters, None when none of them filters anything. Cached asset
+# data is stored under it, so changed filter settings don't return images of the old ones.
+def get_filters_signature(asset_filters: dict):
+    params = {name: asset_filter.get_query_params() for name, asset_filter in asset_filters.items()}
+    if not any(params.values()): return None
+    params_json = json.dumps(params, sort_keys=True)
+    return hashlib.sha1(params_json.encode('utf-8')).hexdigest()[:8]
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+# Content addressed store of the images downloaded by the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import hashlib
+import logging
+import json
+import os
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+# ------------------------------------------------------------------------------------------------
+# Keeps one copy of every downloaded image, named after the SHA-256 of its content, and an
+# index of which URL has which content. An image requested again, by another ROM or on a
+# rescan, is copied to its destination instead of being downloaded. Images with the same
+# content share one blob. Copies are used rather than hardlinks, so rewriting the image of one
+# ROM never changes the store or the images of other ROMs.
+# When the blobs take more than max_bytes the least recently used ones are evicted on
+# flush(). A max_bytes of 0 means no limit. The index is loaded on first use. All methods are
+# thread safe.
+#
+# Layout: <store_dir>/index.json and <store_dir>/<first 2 hash characters>/<hash>
+# ------------------------------------------------------------------------------------------------
+class ImageStore(object):
+    def __init__(self, store_dir: str, max_bytes: int, clock=time.time):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, 'index.json')
+        self.max_bytes = max_bytes
+        # URL -> content hash and blob hash -> {'size', 'last_used'}.
+        self.urls = {}
+        self.blobs = {}
+        self.dirty = False
+        self._is_loaded = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def get_size(self) -> int:
+        with self._lock:
+            self._load()
+            return sum(blob['size'] for blob in self.blobs.values())
+
+    # Puts the stored image of the URL at file_path. Returns the number of bytes or None
+    # when the URL is not in the store.
+    def place(self, url: str, file_path: str) -> int:
+        with self._lock:
+            self._load()
+            content_hash = self.urls.get(url)
+            if content_hash is None or content_hash not in self.blobs: return None
+            blob_path = self._get_blob_path(content_hash)
+            if not os.path.exists(blob_path):
+                self._remove_blob(content_hash)
+                return None
+            self.blobs[content_hash]['last_used'] = self._clock()
+            self.dirty = True
+            size = self.blobs[content_hash]['size']
+        try:
+            self._copy(blob_path, file_path)
+        except OSError as ex:
+            logger.error('ImageStore.place() Cannot place stored image', exc_info=ex)
+            return None
+        return size
+
+    # Adds a downloaded image. When an image with the same content is stored already, only the
+    # URL is added to the index.
+    def add(self, url: str, file_path: str):
+        try:
+            content_hash, size = self._hash_file(file_path)
+        except OSError as ex:
+            logger.error('ImageStore.add() Cannot read downloaded image', exc_info=ex)
+            return
+        blob_path = self._get_blob_path(content_hash)
+        with self._lock:
+            self._load()
+            is_stored = content_hash in self.blobs and os.path.exists(blob_path)
+            self.urls[url] = content_hash
+            self.blobs[content_hash] = {'size': size, 'last_used': self._clock()}
+            self.dirty = True
+        if is_stored: return
+        try:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            self._copy(file_path, blob_path)
+        except OSError as ex:
+            logger.error('ImageStore.add() Cannot store image', exc_info=ex)
+            with self._lock:
+                self.urls.pop(url, None)
+                self._remove_blob(content_hash)
+
+    # Evicts the least recently used blobs above the size limit and saves the index.
+    def flush(self):
+        with self._lock:
+            if not self._is_loaded: return
+            self._evict()
+            if not self.dirty: return
+            try:
+                os.makedirs(self.store_dir, exist_ok=True)
+                temp_path = '{}.tmp'.format(self.index_path)
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'urls': self.urls, 'blobs': self.blobs}, f)
+                os.replace(temp_path, self.index_path)
+                self.dirty = False
+            except OSError as ex:
+                logger.error('ImageStore.flush() Cannot save index "{}"'.format(self.index_path), exc_info=ex)
+                return
+            logger.debug('ImageStore.flush() Saved {} URLs and {} images'.format(len(self.urls), len(self.blobs)))
+
+    def _evict(self):
+        total_size = sum(blob['size'] for blob in self.blobs.values())
+        if self.max_bytes <= 0 or total_size <= self.max_bytes: return
+        for content_hash in sorted(self.blobs, key=lambda content_hash: self.blobs[content_hash]['last_used']):
+            if total_size <= self.max_bytes: break
+            total_size -= self.blobs[content_hash]['size']
+            self._remove_blob(content_hash)
+            try:
+                os.remove(self._get_blob_path(content_hash))
+            except OSError:
+                pass
+        logger.debug('ImageStore._evict() Store size is {} bytes'.format(total_size))
+
+    # Removes a blob and the URLs pointing to it from the index. Called with the lock held.
+    def _remove_blob(self, content_hash: str):
+        self.blobs.pop(content_hash, None)
+        self.urls = {url: url_hash for url, url_hash in self.urls.items() if url_hash != content_hash}
+        self.dirty = True
+
+    def _get_blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.store_dir, content_hash[:2], content_hash)
+
+    def _hash_file(self, file_path: str):
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+                size += len(chunk)
+        return sha256.hexdigest(), size
+
+    # Writes through a temporary file, so file_path is replaced atomically and never left
+    # half written.
+    def _copy(self, source_path: str, file_path: str):
+        temp_path = '{}.part'.format(file_path)
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, file_path)
+
+    # Called with the lock held.
+    def _load(self):
+        if self._is_loaded: return
+        self._is_loaded = True
+        if not os.path.exists(self.index_path): return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.urls = index['urls']
+            self.blobs = index['blobs']
+        except (OSError, ValueError, KeyError, TypeError) as ex:
+            logger.error('ImageStore._load() Cannot load "{}". Starting empty.'.format(self.index_path), exc_info=ex)
+            self.urls = {}
+            self.blobs = {}
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Incremental parsing of the JSON list in a SteamGridDB API response.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import codecs
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\n\r'
+
+
+# ------------------------------------------------------------------------------------------------
+# Iterates over the items of one list in a JSON object, e.g. the 'data' list of
+# {"success": true, "data": [...]}, while the bytes come in. Only the item being parsed and
+# the unparsed rest of the last chunk are kept in memory, so a response with hundreds of
+# images never exists as a whole, and iteration can stop before the response is read.
+# The other members of the object are kept in 'fields' as they are parsed.
+# Raises ValueError when the data is not valid JSON or not an object.
+# ------------------------------------------------------------------------------------------------
+class JsonListStream(object):
+    def __init__(self, chunks, list_key: str = 'data'):
+        self.chunks = iter(chunks)
+        self.list_key = list_key
+        self.fields = {}
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}': return
+        while True:
+            key = self._read_value()
+            if not isinstance(key, str): raise ValueError('Expected a member name')
+            self._expect(':')
+            if key == self.list_key and self._peek() == '[':
+                self._expect('[')
+                yield from self._iter_list()
+            else:
+                self.fields[key] = self._read_value()
+            if self._read_delimiter(',}') == '}': return
+
+    def _iter_list(self):
+        if self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            yield self._read_value()
+            if self._read_delimiter(',]') == ']': return
+
+    # Decodes the next JSON value. A value which ends at the end of the buffer may be cut
+    # short, e.g. a number, so it is only accepted once more data or the end is seen.
+    def _read_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof: raise
+            self._read_chunk()
+
+    def _read_delimiter(self, delimiters: str) -> str:
+        character = self._peek()
+        if character not in delimiters:
+            raise ValueError('Expected one of "{}" at position {}'.format(delimiters, self._position))
+        self._position += 1
+        return character
+
+    def _expect(self, character: str):
+        self._read_delimiter(character)
+
+    # Returns the next character which is not whitespace, without consuming it.
+    def _peek(self) -> str:
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer): return self._buffer[self._position]
+            if self._eof: raise ValueError('Unexpected end of JSON data')
+            self._read_chunk()
+
+    def _read_chunk(self):
+        # Drop the parsed part of the buffer before adding to it.
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._text_decoder.decode(b'', final=True)
+        else:
+            self._buffer += self._text_decoder.decode(chunk)
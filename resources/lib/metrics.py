@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# Timing and counters instrumentation for the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds of the histogram buckets. The last bucket has no bound.
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+# ------------------------------------------------------------------------------------------------
+# Latency histogram with fixed buckets. Percentiles are reported as the upper bound of the
+# bucket they fall in, which is enough to tell 5 ms cache reads from 500 ms API calls.
+# ------------------------------------------------------------------------------------------------
+class Histogram(object):
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def record(self, seconds: float):
+        milliseconds = seconds * 1000
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        bucket = 0
+        while bucket < len(HISTOGRAM_BUCKETS_MS) and milliseconds > HISTOGRAM_BUCKETS_MS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    def get_percentile_ms(self, percentile: float) -> float:
+        if self.count == 0: return 0.0
+        rank = percentile / 100 * self.count
+        num_values = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            num_values += bucket_count
+            if num_values >= rank and bucket_count > 0:
+                if bucket < len(HISTOGRAM_BUCKETS_MS): return float(HISTOGRAM_BUCKETS_MS[bucket])
+                break
+        return self.max * 1000
+
+    def get_summary(self) -> dict:
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 3),
+            'mean_ms': round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            'min_ms': round(self.min * 1000, 1) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 1) if self.count else 0.0,
+            'p50_ms': self.get_percentile_ms(50),
+            'p95_ms': self.get_percentile_ms(95),
+            'buckets_ms': self._get_bucket_counts()
+        }
+
+    def _get_bucket_counts(self) -> dict:
+        bucket_counts = {}
+        for bucket, bucket_count in enumerate(self.buckets):
+            if bucket_count == 0: continue
+            if bucket < len(HISTOGRAM_BUCKETS_MS):
+                bucket_counts['<={}'.format(HISTOGRAM_BUCKETS_MS[bucket])] = bucket_count
+            else:
+                bucket_counts['>{}'.format(HISTOGRAM_BUCKETS_MS[-1])] = bucket_count
+        return bucket_counts
+
+
+class _Timer(object):
+    def __init__(self, metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.start_time = 0.0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.record_time(self.name, time.perf_counter() - self.start_time)
+        return False
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# ------------------------------------------------------------------------------------------------
+# Collects latency histograms and counters of a scraper run. All methods are thread safe.
+# When disabled every call returns right away, time() returns a shared no-op timer.
+# Names are dotted, e.g. 'http.games/id' or 'sleep.rate_limit'.
+# ------------------------------------------------------------------------------------------------
+class Metrics(object):
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+    # Context manager timing the enclosed block.
+    def time(self, name: str):
+        if not self.enabled: return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record_time(self, name: str, seconds: float):
+        if not self.enabled: return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def add(self, name: str, value: float = 1):
+        if not self.enabled: return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_summary(self) -> dict:
+        with self._lock:
+            return {
+                'duration_s': round(time.time() - self.start_time, 3),
+                'timings': {name: histogram.get_summary() for name, histogram in sorted(self.histograms.items())},
+                'counters': {
+                    name: round(value, 3) if isinstance(value, float) else value
+                    for name, value in sorted(self.counters.items())
+                }
+            }
+
+    # Writes the summary to the log and, when a file path is given, to a JSON file.
+    def dump(self, file_path: str = None):
+        if not self.enabled: return
+        summary = self.get_summary()
+        logger.info('Metrics.dump() Scraper metrics of the last {} seconds'.format(summary['duration_s']))
+        for name, timing in summary['timings'].items():
+            logger.info('  {:<28} {:>6} calls {:>9.3f} s  mean {:>7.1f} ms  p50 <={:>6.0f} ms  p95 <={:>6.0f} ms'.format(
+                name, timing['count'], timing['total_s'], timing['mean_ms'], timing['p50_ms'], timing['p95_ms']))
+        for name, value in summary['counters'].items():
+            logger.info('  {:<28} {}'.format(name, value))
+
+        if file_path is None: return
+        try:
+            temp_path = '{}.tmp'.format(file_path)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=1)
+            os.replace(temp_path, file_path)
+            logger.info('Metrics.dump() Saved metrics in "{}"'.format(file_path))
+        except OSError as ex:
+            logger.error('Metrics.dump() Cannot save metrics in "{}"'.format(file_path), exc_info=ex)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Prefetching of SteamGridDB data for the next ROMs of a scan.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Upper limit of the prefetch workers, the requests still share the rate limiter.
+MAX_WORKERS = 4
+
+
+# ------------------------------------------------------------------------------------------------
+# Runs prefetch_function(item) for the items ahead of the one being processed.
+# The items are given in processing order as (key, item) pairs. advance(key) tells the
+# scheduler which item is processed now, it then keeps the next 'lookahead' items submitted
+# to a bounded worker pool. Prefetching stops when is_canceled() returns True or on
+# shutdown(), items not started yet are dropped.
+# Errors in prefetch_function are logged and ignored, the item is then simply fetched again
+# when it is processed.
+# ------------------------------------------------------------------------------------------------
+class PrefetchScheduler(object):
+    def __init__(self, prefetch_function, lookahead: int, is_canceled=None):
+        self.prefetch_function = prefetch_function
+        self.lookahead = lookahead
+        self.is_canceled = is_canceled
+        self.items = []
+        self.item_indexes = {}
+        self.position = -1
+        self.next_index = 0
+        self.canceled = False
+        self.futures = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(lookahead, MAX_WORKERS)))
+
+    # Starts prefetching the first items.
+    def start(self, items: list):
+        with self._lock:
+            self.items = [item for _, item in items]
+            for index, (key, _) in enumerate(items):
+                self.item_indexes.setdefault(key, index)
+        self._submit_window()
+
+    def advance(self, key):
+        with self._lock:
+            index = self.item_indexes.get(key)
+            if index is None or index <= self.position: return
+            self.position = index
+        self._submit_window()
+
+    # Waits until the submitted items are prefetched.
+    def join(self):
+        with self._lock:
+            futures = list(self.futures)
+        for future in futures:
+            if not future.cancelled(): future.exception()
+
+    def cancel(self):
+        with self._lock:
+            self.canceled = True
+            futures = self.futures
+            self.futures = []
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _submit_window(self):
+        if self._check_canceled(): return
+        with self._lock:
+            self.futures = [future for future in self.futures if not future.done()]
+            self.next_index = max(self.next_index, self.position + 1)
+            while self.next_index < len(self.items) and self.next_index <= self.position + self.lookahead:
+                self.futures.append(self._executor.submit(self._run, self.items[self.next_index]))
+                self.next_index += 1
+
+    def _run(self, item):
+        if self._check_canceled(): return
+        try:
+            self.prefetch_function(item)
+        except Exception as ex:
+            logger.error('PrefetchScheduler._run() Exception while prefetching', exc_info=ex)
+
+    def _check_canceled(self) -> bool:
+        if self.canceled: return True
+        if self.is_canceled is not None and self.is_canceled():
+            logger.info('PrefetchScheduler: Canceled')
+            self.cancel()
+            return True
+        return False
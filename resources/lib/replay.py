@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#
+# Record and replay of SteamGridDB responses for offline tests and benchmarks.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Values of the transport mode setting.
+MODE_LIVE = 0
+MODE_RECORD = 1
+MODE_REPLAY = 2
+
+_SLUG_REGEX = re.compile(r'[^A-Za-z0-9]+')
+# Response headers which are stored with a fixture. The others describe the original
+# connection and don't apply to a replayed response.
+_RECORDED_HEADERS = ['content-type', 'etag', 'last-modified', 'retry-after']
+
+
+# ------------------------------------------------------------------------------------------------
+# Directory of recorded responses. Every URL is stored in a JSON file named after its path,
+# the host is ignored so fixtures recorded against the live API and CDN can be replayed
+# against any URL. JSON bodies are stored readable in the fixture, like the debug dumps of
+# the scraper, other bodies (images) in a separate .bin file.
+# ------------------------------------------------------------------------------------------------
+class FixtureStore(object):
+    def __init__(self, fixture_dir: str):
+        self.fixture_dir = fixture_dir
+        self._lock = threading.Lock()
+
+    def save(self, url: str, status: int, headers: dict, body: bytes):
+        name = self.get_fixture_name(url)
+        headers = {key.lower(): value for key, value in headers.items()}
+        fixture = {
+            'url': url,
+            'status': status,
+            'headers': {key: headers[key] for key in _RECORDED_HEADERS if key in headers}
+        }
+        if 'json' in headers.get('content-type', ''):
+            try:
+                fixture['json'] = json.loads(body.decode('utf-8'))
+            except ValueError:
+                fixture['body_file'] = '{}.bin'.format(name)
+        else:
+            fixture['body_file'] = '{}.bin'.format(name)
+
+        with self._lock:
+            if not os.path.exists(self.fixture_dir): os.makedirs(self.fixture_dir)
+            if 'body_file' in fixture:
+                with open(os.path.join(self.fixture_dir, fixture['body_file']), 'wb') as f:
+                    f.write(body)
+            with open(os.path.join(self.fixture_dir, '{}.json'.format(name)), 'w', encoding='utf-8') as f:
+                json.dump(fixture, f, indent=1)
+        logger.debug('FixtureStore.save() Recorded fixture "{}"'.format(name))
+
+    # Returns (status, headers, body) of the recorded response or None.
+    def load(self, url: str):
+        name = self.get_fixture_name(url)
+        fixture_path = os.path.join(self.fixture_dir, '{}.json'.format(name))
+        if not os.path.exists(fixture_path): return None
+        with open(fixture_path, 'r', encoding='utf-8') as f:
+            fixture = json.load(f)
+        if 'body_file' in fixture:
+            with open(os.path.join(self.fixture_dir, fixture['body_file']), 'rb') as f:
+                body = f.read()
+        else:
+            body = json.dumps(fixture.get('json')).encode('utf-8')
+        return fixture['status'], fixture['headers'], body
+
+    def get_fixture_name(self, url: str) -> str:
+        parts = urlsplit(url)
+        path = '{}?{}'.format(parts.path, parts.query) if parts.query else parts.path
+        slug = _SLUG_REGEX.sub('_', path).strip('_')[-80:]
+        return '{}_{}'.format(slug, hashlib.sha1(path.encode('utf-8')).hexdigest()[:8])
+
+
+# ------------------------------------------------------------------------------------------------
+# Transport adapter which sends the requests to the network and records every response in a
+# fixture store. HTTP 429 responses are not recorded, replay injects those on its own.
+# ------------------------------------------------------------------------------------------------
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, fixture_store: FixtureStore, **kwargs):
+        super(RecordingAdapter, self).__init__(**kwargs)
+        self.fixture_store = fixture_store
+
+    def send(self, request, **kwargs):
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        if response.status_code != 429:
+            # Reading the content keeps it available for streaming by the caller.
+            self.fixture_store.save(request.url, response.status_code, response.headers, response.content)
+        return response
+
+
+# ------------------------------------------------------------------------------------------------
+# Transport adapter which serves the responses of a fixture store without any network access.
+# * Every request is delayed by 'latency' seconds to simulate the network.
+# * When rate_limit_every is N > 0, every Nth request gets a HTTP 429 with a Retry-After of
+#   'retry_after' seconds, to exercise the backoff.
+# * A request with an If-None-Match matching the recorded ETag gets a HTTP 304.
+# * URLs without fixture get a HTTP 404.
+# ------------------------------------------------------------------------------------------------
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, fixture_store: FixtureStore, latency: float = 0.0, rate_limit_every: int = 0,
+                 retry_after: int = 1):
+        super(ReplayAdapter, self).__init__()
+        self.fixture_store = fixture_store
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.num_requests = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        with self._lock:
+            self.num_requests += 1
+            num_requests = self.num_requests
+        if self.latency > 0: time.sleep(self.latency)
+
+        if self.rate_limit_every > 0 and num_requests % self.rate_limit_every == 0:
+            return self._build_response(request, 429, {'Retry-After': str(self.retry_after)}, b'')
+
+        fixture = self.fixture_store.load(request.url)
+        if fixture is None:
+            logger.warning('ReplayAdapter.send() No fixture for "{}"'.format(request.url))
+            return self._build_response(request, 404, {}, b'')
+        status, headers, body = fixture
+        if 'etag' in headers and request.headers.get('If-None-Match') == headers['etag']:
+            return self._build_response(request, 304, headers, b'')
+        return self._build_response(request, status, headers, body)
+
+    def close(self):
+        pass
+
+    def _build_response(self, request, status: int, headers: dict, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.reason = 'Replayed'
+        return response
@@ -18,19 +18,48 @@ from __future__ import unicode_literals
 from __future__ import division
 
 import logging
+import hashlib
 import json
-from datetime import datetime, timedelta
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlencode, urlsplit
 
 # --- AKL packages ---
 from akl import constants, settings
-from akl.utils import io, net, kodi
+from akl.utils import io, kodi
 from akl.scrapers import Scraper
 from akl.api import ROMObj
 
+from resources.lib.cache import LRUCache, RequestCoalescer, JsonFileCache
+from resources.lib.store import SQLiteCacheStore, SQLiteCache, NAMESPACE_SEARCH, NAMESPACE_GAMES, NAMESPACE_TITLES
+from resources.lib.store import NAMESPACE_NEGATIVE, NAMESPACE_MANIFEST
+from resources.lib.store import migrate_json_caches
+from resources.lib.throttling import RateLimiter, BackoffGate
+from resources.lib.transport import HttpTransport, DownloadResult, POOL_SIZE
+from resources.lib.replay import FixtureStore, RecordingAdapter, ReplayAdapter, MODE_RECORD, MODE_REPLAY
+from resources.lib.titles import normalize_title, get_title_key, strip_title_noise, rank_games
+from resources.lib.metrics import Metrics
+from resources.lib.prefetch import PrefetchScheduler, MAX_WORKERS as PREFETCH_MAX_WORKERS
+from resources.lib.filters import AssetFilter, parse_filter_list, get_filters_signature
+from resources.lib.jsonstream import JsonListStream
+from resources.lib.imagestore import ImageStore
+from resources.lib.checkpoint import ScrapeCheckpoint
+
 logger = logging.getLogger(__name__)
 
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Returned by _retrieve_URL_as_JSON() when a conditional request answered HTTP 304.
+NOT_MODIFIED = object()
+
+# Scanned data of Steam ROMs holding the Steam app ID, and the launch URLs of Steam shortcuts.
+STEAM_APP_ID_KEYS = ['steam_app_id', 'steamid', 'steam_appid']
+_STEAM_URL_REGEX = re.compile(r'steam://(?:rungameid|run)/(\d+)', re.IGNORECASE)
+
 # ------------------------------------------------------------------------------------------------
 # SteamGridDB online scraper.
 #
@@ -54,21 +83,202 @@ class SteamGridDB(Scraper):
     
     # BASE URLS
     API_URL = 'https://www.steamgriddb.com/api/v2/'
+
+    # Number of times a failed image download is retried.
+    DOWNLOAD_RETRIES = 2
+
+    # Candidate order of a confident pick of a search. See titles.rank_games(). Automatic picks
+    # are only added to the title index with this order, so a poor pick does not stick.
+    EXACT_MATCH_ORDER = 100
+    TITLE_INDEX_FILE_VERSION = 1
+
+    # Disk cache types which are stored per game in the game store instead of per ROM.
+    GAME_CACHE_TYPES = [Scraper.CACHE_METADATA, Scraper.CACHE_INTERNAL]
     
     # --- Constructor ----------------------------------------------------------------------------
     def __init__(self):
         # --- This scraper settings ---
         self.api_key = settings.getSetting('scraper_steamgriddb_apikey')
+        self.concurrent_fetch = settings.getSettingAsBool('scraper_steamgriddb_concurrent_fetch')
+        self.download_workers = settings.getSettingAsInt('scraper_steamgriddb_download_workers')
+        self.prefetch_depth = settings.getSettingAsInt('scraper_steamgriddb_prefetch_depth')
+        self.use_title_index = settings.getSettingAsBool('scraper_steamgriddb_title_index')
+        self.incremental_rescan = settings.getSettingAsBool('scraper_steamgriddb_incremental_rescan')
+        self.store_batch_size = settings.getSettingAsInt('scraper_steamgriddb_store_batch_size')
+        self.asset_filters = self._create_asset_filters()
+        # Assets are stored per filter settings, see filters.get_filters_signature().
+        filters_signature = get_filters_signature(self.asset_filters)
+        self.assets_data_type = 'assets' if filters_signature is None else 'assets@{}'.format(filters_signature)
         
         # --- Misc stuff ---
-        self.cache_candidates = {}
-        self.cache_metadata = {}
-        self.cache_assets = {}
-        self.all_asset_cache = {}
+        # Timings and counters of the run, dumped at the end with dump_metrics().
+        self.metrics = Metrics(settings.getSettingAsBool('scraper_steamgriddb_metrics'))
+        # Memory tier in front of the disk caches.
+        self.memory_cache = LRUCache(
+            settings.getSettingAsInt('scraper_steamgriddb_memory_cache_entries'),
+            settings.getSettingAsInt('scraper_steamgriddb_memory_cache_mb') * 1024 * 1024)
+        # Secondary cache keyed by SteamGridDB game ID. Different ROMs resolving to the same game
+        # share the data and concurrent lookups of the same game share one fetch.
+        self.game_cache = LRUCache(
+            settings.getSettingAsInt('scraper_steamgriddb_memory_cache_entries'),
+            settings.getSettingAsInt('scraper_steamgriddb_memory_cache_mb') * 1024 * 1024)
+        self.game_requests = RequestCoalescer()
+        # Separate request budgets for the JSON API and for the image CDN hosts.
+        self.rate_limiter = RateLimiter(
+            settings.getSettingAsInt('scraper_steamgriddb_cdn_rate'),
+            settings.getSettingAsInt('scraper_steamgriddb_cdn_burst'))
+        self.rate_limiter.set_host_limit(
+            SteamGridDB.API_URL,
+            settings.getSettingAsInt('scraper_steamgriddb_api_rate'),
+            settings.getSettingAsInt('scraper_steamgriddb_api_burst'))
+        self.backoff = BackoffGate(
+            max_delay=settings.getSettingAsInt('scraper_steamgriddb_max_backoff'),
+            on_wait=self._report_backoff,
+            is_canceled=self._is_canceled)
+        self.transport = HttpTransport(
+            self.rate_limiter, self.backoff,
+            headers={'Authorization': f'Bearer {self.api_key}'},
+            max_retries=Scraper.RETRY_THRESHOLD,
+            adapter=self._create_transport_adapter(),
+            metrics=self.metrics,
+            pool_size=self._get_pool_size())
+        self.pdialog = None
+        self.prefetcher = None
+        # Title index keys of the search of the current ROM, see set_candidate().
+        self.candidate_search_keys = []
+        # Candidates are picked by the user, see set_manual_selection().
+        self.manual_selection = False
+        # Game and downloaded images of the current ROM, see record_scraped_rom().
+        self.rom_record = None
+        # Rescan manifest entries of the ROMs not saved in AKL yet.
+        self.pending_manifest = {}
+        # Signature of the AKL scrape settings of the run, see set_scrape_settings().
+        self.scrape_settings_signature = None
 
         cache_dir = settings.getSettingAsFilePath('scraper_cache_dir')
         # --- Pass down common scraper settings ---
         super(SteamGridDB, self).__init__(cache_dir)
+        self.metrics_file_path = None
+        if settings.getSettingAsBool('scraper_steamgriddb_metrics_file'):
+            self.metrics_file_path = cache_dir.pjoin('SteamGridDB_metrics.json').getPathTranslated()
+        self.checkpoint_file_path = cache_dir.pjoin('SteamGridDB_checkpoints.json').getPathTranslated()
+
+        # Search results and the per game metadata and assets are stored either in JSON files
+        # or in a single SQLite database. A JSON file is loaded completely on the first use of
+        # its cache, so calls which never use it don't read it and candidate lookups on repeated
+        # scans don't need the network.
+        search_cache_ttl = settings.getSettingAsInt('scraper_steamgriddb_search_cache_ttl') * SECONDS_PER_DAY
+        search_cache_size = settings.getSettingAsInt('scraper_steamgriddb_search_cache_size')
+        # Game data older than this is revalidated with a conditional request.
+        self.game_cache_ttl = settings.getSettingAsInt('scraper_steamgriddb_game_cache_ttl') * SECONDS_PER_DAY
+        # Searches without candidates and games without images are asked again after this.
+        self.negative_cache_ttl = settings.getSettingAsInt('scraper_steamgriddb_negative_cache_ttl') * SECONDS_PER_DAY
+        # Downloaded images, shared by all ROMs and kept between scans.
+        self.image_store = None
+        if settings.getSettingAsBool('scraper_steamgriddb_image_store'):
+            self.image_store = ImageStore(
+                cache_dir.pjoin('SteamGridDB_images', isdir=True).getPathTranslated(),
+                settings.getSettingAsInt('scraper_steamgriddb_image_store_mb') * 1024 * 1024)
+        self.cache_store = None
+        if settings.getSettingAsBool('scraper_steamgriddb_use_sqlite'):
+            self.cache_store = SQLiteCacheStore(cache_dir.pjoin('SteamGridDB.db').getPathTranslated())
+            migrate_json_caches(self.cache_store, cache_dir.getPathTranslated(), self.get_filename())
+            self.search_cache = SQLiteCache(self.cache_store, NAMESPACE_SEARCH, search_cache_ttl, search_cache_size)
+            self.game_store = SQLiteCache(self.cache_store, NAMESPACE_GAMES, 0, 0)
+            self.title_index = SQLiteCache(self.cache_store, NAMESPACE_TITLES, 0, 0)
+            self.negative_cache = SQLiteCache(self.cache_store, NAMESPACE_NEGATIVE, self.negative_cache_ttl, 0)
+            self.rescan_manifest = SQLiteCache(self.cache_store, NAMESPACE_MANIFEST, 0, 0)
+        else:
+            self.search_cache = JsonFileCache(
+                cache_dir.pjoin('SteamGridDB_search.json').getPathTranslated(), search_cache_ttl, search_cache_size)
+            self.game_store = JsonFileCache(cache_dir.pjoin('SteamGridDB_games.json').getPathTranslated(), 0, 0)
+            self.title_index = JsonFileCache(cache_dir.pjoin('SteamGridDB_titles.json').getPathTranslated(), 0, 0)
+            self.negative_cache = JsonFileCache(
+                cache_dir.pjoin('SteamGridDB_negative.json').getPathTranslated(), self.negative_cache_ttl, 0)
+            self.rescan_manifest = JsonFileCache(cache_dir.pjoin('SteamGridDB_manifest.json').getPathTranslated(), 0, 0)
+
+    # In record mode all responses are stored as fixtures, in replay mode the responses are
+    # served from the fixtures without network access. Returns None for the live transport.
+    # Connections needed at the same time: the asset requests of the ROM being scraped and of
+    # every prefetch worker, next to the image downloads. Without enough connections urllib3
+    # throws away the extra ones and has to open new connections for the next requests.
+    def _get_pool_size(self) -> int:
+        num_asset_requests = (PREFETCH_MAX_WORKERS + 1) * len(SteamGridDB.asset_name_mapping)
+        return max(POOL_SIZE, num_asset_requests + self.download_workers)
+
+    def _create_transport_adapter(self):
+        transport_mode = settings.getSettingAsInt('scraper_steamgriddb_transport_mode')
+        if transport_mode not in [MODE_RECORD, MODE_REPLAY]: return None
+
+        fixture_dir = settings.getSetting('scraper_steamgriddb_fixture_dir')
+        if fixture_dir:
+            fixture_dir = io.FileName(fixture_dir, isdir=True)
+        else:
+            fixture_dir = settings.getSettingAsFilePath('scraper_cache_dir').pjoin('fixtures', isdir=True)
+        fixture_store = FixtureStore(fixture_dir.getPathTranslated())
+        if transport_mode == MODE_RECORD:
+            logger.info('SteamGridDB._create_transport_adapter() Recording responses in "{}"'.format(fixture_dir.getPath()))
+            return RecordingAdapter(fixture_store)
+
+        logger.info('SteamGridDB._create_transport_adapter() Replaying responses from "{}"'.format(fixture_dir.getPath()))
+        return ReplayAdapter(
+            fixture_store,
+            latency=settings.getSettingAsInt('scraper_steamgriddb_replay_latency') / 1000,
+            rate_limit_every=settings.getSettingAsInt('scraper_steamgriddb_replay_429_every'))
+
+    # Image filters of the grids, heroes and logos endpoints from the addon settings.
+    def _create_asset_filters(self):
+        mimes = parse_filter_list(settings.getSetting('scraper_steamgriddb_asset_mimes'))
+        nsfw = settings.getSettingAsInt('scraper_steamgriddb_asset_nsfw')
+        humor = settings.getSettingAsInt('scraper_steamgriddb_asset_humor')
+        limit = settings.getSettingAsInt('scraper_steamgriddb_asset_limit')
+        return {
+            'grids': AssetFilter(
+                parse_filter_list(settings.getSetting('scraper_steamgriddb_grid_styles')),
+                parse_filter_list(settings.getSetting('scraper_steamgriddb_grid_dimensions')),
+                mimes, nsfw, humor, limit),
+            'heroes': AssetFilter(
+                parse_filter_list(settings.getSetting('scraper_steamgriddb_hero_styles')),
+                parse_filter_list(settings.getSetting('scraper_steamgriddb_hero_dimensions')),
+                mimes, nsfw, humor, limit),
+            'logos': AssetFilter(
+                parse_filter_list(settings.getSetting('scraper_steamgriddb_logo_styles')),
+                None, mimes, nsfw, humor, limit)
+        }
+
+    # Fetches the search results and the game data of the next ROMs of a scan in the background,
+    # while the current ROM is processed. The data ends up in the search and game caches, so
+    # the calls of the ScrapeStrategy are mostly cache hits. The roms are given in the order
+    # they will be scraped. Stops when the progress dialog is canceled or with stop_prefetch().
+    def start_prefetch(self, roms: list, pdialog: kodi.ProgressDialog = None):
+        if self.prefetch_depth <= 0 or not roms: return
+        self.stop_prefetch()
+        logger.debug('SteamGridDB.start_prefetch() Prefetching {} ROMs, {} ahead'.format(len(roms), self.prefetch_depth))
+        self.prefetcher = PrefetchScheduler(
+            self._prefetch_rom,
+            self.prefetch_depth,
+            is_canceled=pdialog.isCanceled if pdialog is not None else None)
+        # Keyed without file name noise like "(USA)", as the search terms are cleaned up.
+        self.prefetcher.start([
+            (get_title_key(rom.get_identifier()), rom) for rom in roms if rom.get_identifier()
+        ])
+
+    def stop_prefetch(self):
+        if self.prefetcher is None: return
+        self.prefetcher.shutdown()
+        self.prefetcher = None
+
+    # Writes the metrics of the run to the log and to the metrics file, when enabled.
+    def dump_metrics(self):
+        if not self.metrics.enabled: return
+        for cache_name, cache in [('memory_cache', self.memory_cache), ('game_cache', self.game_cache)]:
+            for stat_name, value in cache.get_stats().items():
+                self.metrics.add('{}.{}'.format(cache_name, stat_name), value)
+        self.metrics.dump(self.metrics_file_path)
+
+    # Progress dialog used to report waits caused by the API rate limit.
+    def set_progress_dialog(self, pdialog: kodi.ProgressDialog):
+        self.pdialog = pdialog
 
     # --- Base class abstract methods ------------------------------------------------------------
     def get_name(self): return 'SteamGridDB'
@@ -117,11 +327,138 @@ class SteamGridDB(Scraper):
         # --- Request is not cached. Get candidates and introduce in the cache ---
         logger.debug('SteamGridDB.get_candidates() search_term          "{0}"'.format(search_term))
         logger.debug('SteamGridDB.get_candidates() AKL platform         "{0}"'.format(platform))
-        candidate_list = self._search_candidates(search_term, platform, status_dic)
+        if self.prefetcher is not None: self.prefetcher.advance(get_title_key(search_term))
+        self.candidate_search_keys = [get_title_key(search_term)]
+        if self.manual_selection:
+            # The user searches again, so the pick of the index may be wrong. Forget it, the
+            # new pick is indexed under the search term and the ROM identifier.
+            rom_key = get_title_key(rom.get_identifier()) if rom is not None else None
+            if rom_key and rom_key not in self.candidate_search_keys: self.candidate_search_keys.append(rom_key)
+            if self.use_title_index:
+                for search_key in self.candidate_search_keys: self.title_index.delete(search_key)
+        candidate_list = self._find_candidates(search_term, rom, platform, status_dic)
         if not status_dic['status']: return None
 
         return candidate_list
 
+    def check_candidates_cache(self, rom_identifier, platform):
+        self.candidate_search_keys = []
+        return super(SteamGridDB, self).check_candidates_cache(rom_identifier, platform)
+
+    # With manual selection the user picks the candidates, which are then always added to the
+    # title index and the title index is never used to skip a search. Automatic picks are only
+    # indexed when they are confident.
+    def set_manual_selection(self, manual_selection: bool):
+        self.manual_selection = manual_selection
+
+    # The selected candidate of a search is added to the title index, so the next scan of the
+    # ROM needs no search.
+    def set_candidate(self, rom_identifier, platform, candidate):
+        super(SteamGridDB, self).set_candidate(rom_identifier, platform, candidate)
+        self.rom_record = {
+            'identifier': rom_identifier,
+            'game_id': candidate['id'] if candidate else None,
+            'images': {}
+        }
+        if self.use_title_index and candidate and \
+                (self.manual_selection or candidate.get('order', 0) >= SteamGridDB.EXACT_MATCH_ORDER):
+            for search_key in self.candidate_search_keys: self._update_title_index(search_key, candidate)
+        self.candidate_search_keys = []
+
+    # --- Incremental rescans ---
+    # A ROM is up to date when it was scraped before under the same name and with the same
+    # scrape settings, all the images downloaded for it still exist and the stored assets of
+    # its game are the same as when it was scraped. Stored assets older than the game cache TTL count as changed, as only a
+    # request can tell.
+    def is_rom_up_to_date(self, rom:ROMObj) -> bool:
+        manifest_entry = self.rescan_manifest.get(str(rom.get_id()))
+        if manifest_entry is None or manifest_entry['identifier'] != rom.get_identifier(): return False
+        if manifest_entry.get('settings_signature') != self.scrape_settings_signature: return False
+        if not all(os.path.exists(file_path) for file_path in manifest_entry['images']): return False
+
+        cached_entry, timestamp = self._get_game_store_entry(self.assets_data_type, manifest_entry['game_id'])
+        if cached_entry['data'] is None: return False
+        if self.game_cache_ttl > 0 and time.time() - timestamp > self.game_cache_ttl: return False
+        return self._get_assets_signature(cached_entry['data']) == manifest_entry['assets_signature']
+
+    # Prepares the rescan manifest entry of a scraped ROM with its game, the URLs of the images
+    # downloaded for it and a signature of the assets of the game. The entry is added to the
+    # manifest by commit_scraped_roms(), once the ROM is saved in AKL.
+    def record_scraped_rom(self, rom:ROMObj):
+        if self.rom_record is None or self.rom_record['identifier'] != rom.get_identifier(): return
+        if self.rom_record['game_id'] is None: return
+        cached_entry, _ = self._get_game_store_entry(self.assets_data_type, self.rom_record['game_id'])
+        if cached_entry['data'] is None: return
+        self.pending_manifest[str(rom.get_id())] = {
+            'identifier': self.rom_record['identifier'],
+            'game_id': self.rom_record['game_id'],
+            'images': self.rom_record['images'],
+            'assets_signature': self._get_assets_signature(cached_entry['data']),
+            'settings_signature': self.scrape_settings_signature
+        }
+        self.rom_record = None
+
+    # The AKL scrape settings of the run, e.g. the asset types to scrape and the overwrite
+    # modes. ROMs scraped with other settings are not up to date.
+    def set_scrape_settings(self, scrape_settings: dict):
+        settings_json = json.dumps(scrape_settings, sort_keys=True, default=str)
+        self.scrape_settings_signature = hashlib.sha1(settings_json.encode('utf-8')).hexdigest()
+
+    def commit_scraped_roms(self):
+        for rom_id, manifest_entry in self.pending_manifest.items():
+            self.rescan_manifest.put(rom_id, manifest_entry)
+        self.pending_manifest = {}
+        self.rescan_manifest.flush()
+        if self.cache_store is not None: self.cache_store.commit()
+
+    def _get_assets_signature(self, asset_index) -> str:
+        asset_urls = {asset_ID: sorted(asset['url'] for asset in asset_list) for asset_ID, asset_list in asset_index.items()}
+        return hashlib.sha1(json.dumps(asset_urls, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Forgets all searches without candidates and games without images, so the next scan asks
+    # SteamGridDB again. Returns the number of entries removed.
+    def purge_negative_cache(self) -> int:
+        num_entries = len(self.negative_cache)
+        self.negative_cache.purge()
+        self.negative_cache.flush()
+        if self.cache_store is not None: self.cache_store.commit()
+        logger.info('SteamGridDB.purge_negative_cache() Removed {} entries'.format(num_entries))
+        return num_entries
+
+    # Checkpoint of the ROMs of a collection or source saved in AKL by a streamed scrape.
+    def get_checkpoint(self, entity_type: str, entity_id: str) -> ScrapeCheckpoint:
+        return ScrapeCheckpoint(self.checkpoint_file_path, entity_type, entity_id)
+
+    # Writes the title index to a JSON file. Returns the number of titles written.
+    def export_title_index(self, file_path: str) -> int:
+        titles = {search_key: game for search_key, game in self.title_index.items()}
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SteamGridDB.TITLE_INDEX_FILE_VERSION, 'titles': titles}, f, indent=1, sort_keys=True)
+        logger.info('SteamGridDB.export_title_index() Exported {} titles'.format(len(titles)))
+        return len(titles)
+
+    # Adds the titles of an exported title index file. Titles may map to a game dictionary
+    # or just to the game ID. Returns the number of titles imported.
+    # Raises ValueError when the file is not a title index.
+    def import_title_index(self, file_path: str) -> int:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            index_data = json.load(f)
+        if not isinstance(index_data, dict) or not isinstance(index_data.get('titles'), dict):
+            raise ValueError('Not a title index file')
+
+        num_titles = 0
+        for title, game in index_data['titles'].items():
+            if isinstance(game, int): game = {'id': game}
+            if not isinstance(game, dict) or not isinstance(game.get('id'), int): continue
+            search_key = get_title_key(title)
+            if not search_key: continue
+            self.title_index.put(search_key, {key: game[key] for key in ('id', 'name', 'steam_app_id') if key in game})
+            num_titles += 1
+        self.title_index.flush()
+        if self.cache_store is not None: self.cache_store.commit()
+        logger.info('SteamGridDB.import_title_index() Imported {} titles'.format(num_titles))
+        return num_titles
+
     def get_metadata(self, status_dic):
         # --- If scraper is disabled return immediately and silently ---
         if self.scraper_disabled:
@@ -133,19 +470,10 @@ class SteamGridDB(Scraper):
             logger.debug('SteamGridDB.get_metadata() Metadata cache hit "{}"'.format(self.cache_key))
             return self._retrieve_from_disk_cache(Scraper.CACHE_METADATA, self.cache_key)
 
-        # --- Request is not cached. Get candidates and introduce in the cache ---
+        # --- Request is not cached. Get metadata of the game and introduce in the cache ---
         logger.debug('SteamGridDB.get_metadata() Metadata cache miss "{}"'.format(self.cache_key))
-        
-        candidate_id = self.candidate['id']
-        url = f'{SteamGridDB.API_URL}games/id/{candidate_id}'
-        json_data = self._retrieve_URL_as_JSON(url, status_dic)
+        gamedata = self._retrieve_from_game_cache('metadata', self.candidate, self._retrieve_metadata, status_dic)
         if not status_dic['status']: return None
-        self._dump_json_debug('SteamGridDB_get_metadata.json', json_data)
-
-        # --- Parse game page data ---
-        gamedata = self._new_gamedata_dic()
-        gamedata['title']       = self._parse_metadata_title(json_data)
-        gamedata['year']        = self._parse_metadata_year(json_data)
 
         # --- Put metadata in the cache ---
         logger.debug('SteamGridDB.get_metadata() Adding to metadata cache "{0}"'.format(self.cache_key))
@@ -162,16 +490,20 @@ class SteamGridDB(Scraper):
             logger.debug('SteamGridDB.get_assets() Scraper disabled. Returning empty data.')
             return []
 
+        # --- Unsupported assets never need a cache lookup or a request ---
+        if not self.supports_asset_ID(asset_info_id):
+            logger.debug('SteamGridDB.get_assets() Asset {} not supported. Returning empty data.'.format(asset_info_id))
+            return []
+
         logger.debug('SteamGridDB.get_assets() Getting assets {} for candidate ID "{}"'.format(
             asset_info_id, self.candidate['id']))
 
-        # Get all assets for candidate. _retrieve_all_assets() caches all assets for a candidate.
-        # Then select asset of a particular type.
-        all_asset_list = self._retrieve_all_assets(self.candidate, status_dic)
+        # Get all assets for candidate. _retrieve_all_assets() caches all assets for a candidate
+        # bucketed by asset ID. Then select the bucket of a particular type.
+        asset_index = self._retrieve_all_assets(self.candidate, status_dic)
         if not status_dic['status']: return None
-        asset_list = [asset_dic for asset_dic in all_asset_list if asset_dic['asset_ID'] == asset_info_id]
-        logger.debug('SteamGridDB::get_assets() Total assets {} / Returned assets {}'.format(
-            len(all_asset_list), len(asset_list)))
+        asset_list = asset_index.get(asset_info_id, [])
+        logger.debug('SteamGridDB::get_assets() Returned assets {}'.format(len(asset_list)))
 
         return asset_list
 
@@ -185,48 +517,231 @@ class SteamGridDB(Scraper):
         return io.get_URL_extension(image_url)
 
     def download_image(self, image_url, image_local_path: io.FileName):
-        self._wait_for_API_request(100)
-        # net_download_img() never prints URLs or paths.
-        net.download_img(image_url, image_local_path)
-        
-        # failed? retry after 5 seconds
-        if not image_local_path.exists():
-            logger.debug('Download failed. Retry after 5 seconds')
-            self._wait_for_API_request(5000)
-            net.download_img(image_url, image_local_path)
+        self.download_images([(image_url, image_local_path)])
         return image_local_path
+
+    # Downloads many images at once on a bounded pool of workers. Accepts a list of
+    # (image_url, FileName) pairs, so all the assets of a ROM or of a batch of ROMs can be
+    # submitted together. Returns a DownloadResult with success and bytes for every pair.
+    # Images in the image store are copied from there instead of downloaded.
+    def download_images(self, download_list: list) -> list:
+        file_list = [(image_url, image_local_path.getPathTranslated()) for image_url, image_local_path in download_list]
+        results = [None] * len(file_list)
+        missing_indexes = []
+        for index, (image_url, file_path) in enumerate(file_list):
+            num_bytes = self.image_store.place(image_url, file_path) if self.image_store is not None else None
+            if num_bytes is None: missing_indexes.append(index)
+            else:                 results[index] = DownloadResult(image_url, file_path, num_bytes)
+        if len(missing_indexes) < len(file_list):
+            self.metrics.add('images.store_hits', len(file_list) - len(missing_indexes))
+
+        # The transport never prints URLs or paths.
+        with self.metrics.time('download_images'):
+            download_results = self.transport.download_many(
+                [file_list[index] for index in missing_indexes],
+                self.download_workers,
+                SteamGridDB.DOWNLOAD_RETRIES)
+        for index, result in zip(missing_indexes, download_results):
+            results[index] = result
+            if result.success and self.image_store is not None:
+                self.image_store.add(result.url, result.file_path)
+        if self.rom_record is not None:
+            self.rom_record['images'].update({result.file_path: result.url for result in results if result.success})
+
+        num_failed = len([result for result in results if not result.success])
+        num_bytes = sum([result.num_bytes for result in results if result.success])
+        logger.debug('SteamGridDB.download_images() Downloaded {} images ({} bytes), {} from the image store, {} failed'.format(
+            len(results) - num_failed, num_bytes, len(file_list) - len(missing_indexes), num_failed))
+        self.metrics.add('images.downloaded', len(missing_indexes) - num_failed)
+        if num_failed: self.metrics.add('images.failed', num_failed)
+        return results
            
+    # ROMs with a Steam app ID are resolved with one exact request. Otherwise the search term is
+    # looked up in the title index and SteamGridDB is only searched when it is not indexed.
+    # A confident pick of a search is added to the index. With manual selection the user is
+    # always shown the search results.
+    def _find_candidates(self, search_term:str, rom:ROMObj, platform:str, status_dic):
+        steam_app_id = self._get_steam_app_id(rom)
+        if steam_app_id is not None:
+            candidate_list = self._find_steam_candidates(steam_app_id, platform, status_dic)
+            if not status_dic['status']: return None
+            if candidate_list: return candidate_list
+
+        search_key = get_title_key(search_term)
+        indexed_game = None
+        if self.use_title_index and not self.manual_selection: indexed_game = self.title_index.get(search_key)
+        if indexed_game is not None:
+            logger.debug('SteamGridDB._find_candidates() Title index hit "{}"'.format(search_key))
+            self.metrics.add('title_index.hits')
+            candidate = self._new_candidate_dic()
+            candidate['id'] = indexed_game['id']
+            candidate['display_name'] = indexed_game.get('name', search_term)
+            candidate['platform'] = platform
+            candidate['scraper_platform'] = platform
+            candidate['order'] = SteamGridDB.EXACT_MATCH_ORDER
+            if indexed_game.get('steam_app_id'): candidate['steam_app_id'] = indexed_game['steam_app_id']
+            return [candidate]
+
+        candidate_list = self._search_candidates(search_term, platform, status_dic)
+        if not status_dic['status']: return None
+        if self.use_title_index and candidate_list and \
+                candidate_list[0]['order'] >= SteamGridDB.EXACT_MATCH_ORDER:
+            self._update_title_index(search_key, candidate_list[0])
+        return candidate_list
+
+    def _update_title_index(self, search_key:str, candidate):
+        indexed_game = self.title_index.get(search_key)
+        if indexed_game is not None and indexed_game['id'] == candidate['id']: return
+        logger.debug('SteamGridDB._update_title_index() Indexing "{}" as game #{}'.format(search_key, candidate['id']))
+        indexed_game = {'id': candidate['id'], 'name': candidate['display_name']}
+        if candidate.get('steam_app_id'): indexed_game['steam_app_id'] = candidate['steam_app_id']
+        self.title_index.put(search_key, indexed_game)
+
+    # Returns the Steam app ID in the scanned data of a ROM, from the Steam library scanner or
+    # the steam://rungameid/<appid> launch URL of a Steam shortcut, or None.
+    def _get_steam_app_id(self, rom:ROMObj):
+        if rom is None: return None
+        for key in STEAM_APP_ID_KEYS:
+            value = rom.get_scanned_data_element(key)
+            if value is not None and str(value).strip().isdigit(): return int(value)
+        for key in ['file', 'url']:
+            value = rom.get_scanned_data_element(key)
+            match = _STEAM_URL_REGEX.search(str(value)) if value else None
+            if match: return int(match.group(1))
+        return None
+
+    # Resolves the game of a Steam app ID with games/steam/{appid}. The game is kept in the game
+    # store under the app ID, so rescans need no request. Returns None when SteamGridDB does
+    # not know the app ID.
+    def _find_steam_candidates(self, steam_app_id:int, platform:str, status_dic):
+        # Steam app IDs SteamGridDB doesn't know are kept in the negative cache, like searches
+        # without results.
+        negative_key = 'steam/{}'.format(steam_app_id)
+        if self.negative_cache_ttl > 0 and self.negative_cache.get(negative_key) is not None:
+            logger.debug('SteamGridDB._find_steam_candidates() Negative cache hit "{}"'.format(negative_key))
+            self.metrics.add('negative_cache.hits')
+            return None
+
+        game = self._retrieve_from_game_cache('steam', {'id': steam_app_id}, self._retrieve_steam_game, status_dic)
+        if not status_dic['status']: return None
+        if game is None:
+            logger.debug('SteamGridDB._find_steam_candidates() Steam app #{} not found'.format(steam_app_id))
+            if self.negative_cache_ttl > 0: self.negative_cache.put(negative_key, True)
+            return None
+        logger.debug('SteamGridDB._find_steam_candidates() Steam app #{} is game #{}'.format(steam_app_id, game['id']))
+        self.metrics.add('steam_app_id.hits')
+        candidate = self._new_candidate_dic()
+        candidate['id'] = game['id']
+        candidate['display_name'] = game['name']
+        candidate['platform'] = platform
+        candidate['scraper_platform'] = platform
+        candidate['order'] = SteamGridDB.EXACT_MATCH_ORDER
+        candidate['steam_app_id'] = steam_app_id
+        return [candidate]
+
+    # The candidate holds the Steam app ID as its ID here, see _find_steam_candidates().
+    def _retrieve_steam_game(self, candidate, status_dic, cached_entry):
+        url = '{}games/steam/{}'.format(SteamGridDB.API_URL, candidate['id'])
+        json_data = self._retrieve_URL_as_JSON(url, status_dic, cached_entry['validators'])
+        if not status_dic['status'] or json_data is None: return None
+        if json_data is NOT_MODIFIED: return cached_entry['data']
+        return {'id': json_data['data']['id'], 'name': json_data['data']['name']}
+
     # --- Retrieve list of games ---
     def _search_candidates(self, search_term:str, platform:str, status_dic):
+        with self.metrics.time('search_candidates'):
+            games_json = self._search_games(search_term, status_dic)
+        if not status_dic['status']: return None
+
+        # --- Parse game list, ranked on the match with the search term. Best candidates go first ---
+        candidate_list = []
+        for item, score in rank_games(search_term, games_json):
+            candidate = self._new_candidate_dic()
+            candidate['id'] = item['id']
+            candidate['display_name'] = item['name']
+            candidate['platform'] = platform
+            candidate['scraper_platform'] = platform
+            candidate['order'] = int(round(score * 100))
+            candidate_list.append(candidate)
+
+        return candidate_list
+
+    # Returns the games found for the search term. ROM file name noise like region tags is
+    # removed before searching. Results are kept in the search cache keyed by the normalized
+    # search term, so repeated titles and rescans don't hit the API again.
+    # Concurrent searches of the same term, e.g. by the prefetcher, share one request.
+    def _search_games(self, search_term:str, status_dic):
+        search_term = strip_title_noise(search_term)
+        search_key = normalize_title(search_term)
+
+        def retrieve():
+            retrieve_status_dic = dict(status_dic)
+            games_json = self.search_cache.get(search_key)
+            if games_json is not None:
+                logger.debug('SteamGridDB._search_games() Search cache hit "{}"'.format(search_key))
+                self.metrics.add('search_cache.hits')
+                return games_json, retrieve_status_dic
+            negative_key = 'search/{}'.format(search_key)
+            if self.negative_cache_ttl > 0 and self.negative_cache.get(negative_key) is not None:
+                logger.debug('SteamGridDB._search_games() Negative cache hit "{}"'.format(search_key))
+                self.metrics.add('negative_cache.hits')
+                return [], retrieve_status_dic
+            self.metrics.add('search_cache.misses')
+            games_json = self._retrieve_games(search_term, search_key, retrieve_status_dic)
+            if retrieve_status_dic['status'] and not games_json and self.negative_cache_ttl > 0:
+                self.negative_cache.put(negative_key, True)
+            return games_json, retrieve_status_dic
+
+        games_json, retrieve_status_dic = self.game_requests.run(('search', search_key), retrieve)
+        if not retrieve_status_dic['status']:
+            status_dic.update(retrieve_status_dic)
+            return None
+        return games_json
+
+    def _retrieve_games(self, search_term:str, search_key:str, status_dic):
         # --- Retrieve JSON data with list of games ---
         search_string_encoded = quote_plus(search_term)
         url = '{}search/autocomplete/{}'.format(SteamGridDB.API_URL, search_string_encoded)
         
         json_data = self._retrieve_URL_as_JSON(url, status_dic)
         if not status_dic['status']: return None
+        if json_data is None: return []
         self._dump_json_debug('SteamGridDB_get_candidates.json', json_data)
 
-        # --- Parse game list ---
-        games_json = json_data['data']
-        candidate_list = []
-        for item in games_json:
-            title = item['name']
-            candidate = self._new_candidate_dic()
-            candidate['id'] = item['id']
-            candidate['display_name'] = title
-            candidate['platform'] = platform
-            candidate['scraper_platform'] = platform
-            candidate['order'] = 1
+        # Only keep the fields needed to build candidates.
+        games_json = [
+            {key: item[key] for key in ('id', 'name', 'release_date') if key in item}
+            for item in json_data['data']
+        ]
+        if games_json:
+            self.search_cache.put(search_key, games_json)
+        return games_json
 
-            # Increase search score based on our own search.
-            if title.lower() == search_term.lower():          candidate['order'] += 2
-            if title.lower().find(search_term.lower()) != -1: candidate['order'] += 1
-            candidate_list.append(candidate)
+    # Puts the search results and the game data of the best candidate of a ROM in the caches.
+    # Runs on the prefetch workers, so it must not touch the per ROM state of the scraper.
+    def _prefetch_rom(self, rom: ROMObj):
+        status_dic = kodi.new_status_dic('Prefetch was OK')
+        with self.metrics.time('prefetch'):
+            candidate_list = self._find_candidates(rom.get_identifier(), rom, None, status_dic)
+            if not status_dic['status'] or not candidate_list: return
+            candidate = candidate_list[0]
+            self._retrieve_from_game_cache('metadata', candidate, self._retrieve_metadata, status_dic)
+            if not status_dic['status']: return
+            self._retrieve_game_assets(candidate, status_dic)
+        self.metrics.add('prefetch.roms')
 
-        # --- Sort game list based on the score. High scored candidates go first ---
-        candidate_list.sort(key = lambda result: result['order'], reverse = True)
+    def _retrieve_metadata(self, candidate, status_dic, cached_entry):
+        url = '{}games/id/{}'.format(SteamGridDB.API_URL, candidate['id'])
+        json_data = self._retrieve_URL_as_JSON(url, status_dic, cached_entry['validators'])
+        if not status_dic['status']: return None
+        if json_data is NOT_MODIFIED: return cached_entry['data']
+        self._dump_json_debug('SteamGridDB_get_metadata.json', json_data)
 
-        return candidate_list
+        # --- Parse game page data ---
+        gamedata = self._new_gamedata_dic()
+        gamedata['title']       = self._parse_metadata_title(json_data)
+        gamedata['year']        = self._parse_metadata_year(json_data)
+        return gamedata
 
     def _parse_metadata_title(self, json_data):
         title_str = json_data['data']['name'] if 'name' in json_data['data'] else constants.DEFAULT_META_TITLE
@@ -241,7 +756,7 @@ class SteamGridDB(Scraper):
         dt_object = datetime.fromtimestamp(float(release_dt))
         return dt_object.year
 
-    # Get ALL available assets for game.
+    # Get ALL available assets for game, bucketed by asset ID.
     # Cache all assets in the internal disk cache.
     def _retrieve_all_assets(self, candidate, status_dic):
         # --- Cache hit ---
@@ -249,140 +764,390 @@ class SteamGridDB(Scraper):
             logger.debug('SteamGridDB._retrieve_all_assets() Internal cache hit "{0}"'.format(self.cache_key))
             return self._retrieve_from_disk_cache(Scraper.CACHE_INTERNAL, self.cache_key)
 
-        # --- Cache miss. Retrieve data and update cache ---
+        # --- Cache miss. Retrieve data of the game and update cache ---
         logger.debug('SteamGridDB._retrieve_all_assets() Internal cache miss "{0}"'.format(self.cache_key))
-               
-        cover_assets = self._retrieve_cover_assets(candidate, status_dic)
+        asset_index = self._retrieve_game_assets(candidate, status_dic)
         if not status_dic['status']: return None
-        fanart_assets = self._retrieve_fanart_assets(candidate, status_dic)
-        if not status_dic['status']: return None
-        logo_assets = self._retrieve_logo_assets(candidate, status_dic)
-        if not status_dic['status']: return None
-        
-        asset_list = cover_assets + fanart_assets + logo_assets
-        logger.debug('SteamGridDB._retrieve_all_assets() A total of {0} assets found for candidate ID {1}'.format(
-            len(asset_list), candidate['id']))
 
         # --- Put metadata in the cache ---
         logger.debug('SteamGridDB._retrieve_all_assets() Adding to internal cache "{0}"'.format(self.cache_key))
-        self._update_disk_cache(Scraper.CACHE_INTERNAL, self.cache_key, asset_list)
+        self._update_disk_cache(Scraper.CACHE_INTERNAL, self.cache_key, asset_index)
 
-        return asset_list
+        return asset_index
 
-    def _retrieve_cover_assets(self, candidate, status_dic):
-        logger.debug('SteamGridDB._retrieve_cover_assets() Getting Covers...')
-        url = '{}grids/game/{}'.format(SteamGridDB.API_URL, candidate['id'])
-        json_data = self._retrieve_URL_as_JSON(url, status_dic)
+    # Looks up the asset index of a game in the game caches. Games without any image are kept
+    # in the negative cache instead of the game store, so they are asked again after the
+    # shorter negative cache TTL.
+    def _retrieve_game_assets(self, candidate, status_dic):
+        negative_key = '{}/{}'.format(self.assets_data_type, candidate['id'])
+        if self.negative_cache_ttl > 0 and self.negative_cache.get(negative_key) is not None:
+            logger.debug('SteamGridDB._retrieve_game_assets() Negative cache hit "{}"'.format(negative_key))
+            self.metrics.add('negative_cache.hits')
+            return self._build_asset_index([])
+
+        asset_index = self._retrieve_from_game_cache(self.assets_data_type, candidate, self._retrieve_asset_index, status_dic)
         if not status_dic['status']: return None
-        self._dump_json_debug('SteamGridDB_assets_covers.json', json_data)
+        if self.negative_cache_ttl > 0 and not any(asset_index.values()):
+            logger.debug('SteamGridDB._retrieve_game_assets() No images for game #{}'.format(candidate['id']))
+            self.negative_cache.put(negative_key, True)
+            self.game_store.delete(negative_key)
+        return asset_index
 
-        # --- Parse images page data ---
-        asset_list = []
-        for image_data in json_data['data']:
-            style = image_data['style'] if 'style' in image_data else 'image'
-            asset_data = self._new_assetdata_dic()
-            asset_data['asset_ID'] = constants.ASSET_BOXFRONT_ID
-            asset_data['display_name'] = "{} by {}".format(style, image_data['author']['name'])
-            asset_data['url_thumb'] = image_data['thumb']
-            asset_data['url'] = image_data['url']
-            if self.verbose_flag: logger.debug('Found cover {0}'.format(asset_data['url_thumb']))
-            asset_list.append(asset_data)
-            
+    # Retrieves the grids, heroes and logos of a game and buckets them by asset ID.
+    def _retrieve_asset_index(self, candidate, status_dic, cached_entry):
+        asset_retrievers = [
+            self._retrieve_cover_assets,
+            self._retrieve_fanart_assets,
+            self._retrieve_logo_assets
+        ]
+        if self.concurrent_fetch:
+            asset_lists = self._retrieve_assets_concurrently(asset_retrievers, candidate, status_dic, cached_entry)
+            if not status_dic['status']: return None
+        else:
+            asset_lists = []
+            for asset_retriever in asset_retrievers:
+                asset_lists.append(asset_retriever(candidate, status_dic, cached_entry))
+                if not status_dic['status']: return None
+
+        asset_index = self._build_asset_index(
+            [asset_data for asset_sublist in asset_lists for asset_data in asset_sublist])
+        logger.debug('SteamGridDB._retrieve_asset_index() A total of {0} assets found for candidate ID {1}'.format(
+            sum([len(asset_list) for asset_list in asset_index.values()]), candidate['id']))
+        return asset_index
+
+    # Looks up data of a game in the caches keyed by SteamGridDB game ID, first in memory and
+    # then in the game store. On a miss, or when the stored data is older than the game cache
+    # TTL, the data is retrieved with retrieve_function(candidate, status_dic, cached_entry).
+    # The cached entry holds the stored data and the response validators (ETag, Last-Modified)
+    # so the requests can be conditional. Concurrent lookups of the same game share one
+    # retrieval and get the same result and status.
+    def _retrieve_from_game_cache(self, data_type, candidate, retrieve_function, status_dic):
+        game_key = (data_type, candidate['id'])
+        data = self.game_cache.get(game_key)
+        if data is not None:
+            logger.debug('SteamGridDB._retrieve_from_game_cache() Game cache hit {}'.format(game_key))
+            return data
+
+        def retrieve():
+            retrieve_status_dic = dict(status_dic)
+            cached_entry, timestamp = self._get_game_store_entry(data_type, candidate['id'])
+            if cached_entry['data'] is not None and \
+                    (self.game_cache_ttl <= 0 or time.time() - timestamp <= self.game_cache_ttl):
+                logger.debug('SteamGridDB._retrieve_from_game_cache() Game store hit {}'.format(game_key))
+                self.metrics.add('game_store.hits')
+                self.game_cache.put(game_key, cached_entry['data'])
+                return cached_entry['data'], retrieve_status_dic
+
+            self.metrics.add('game_store.revalidations' if cached_entry['data'] is not None else 'game_store.misses')
+            data = retrieve_function(candidate, retrieve_status_dic, cached_entry)
+            # Nothing is stored for games SteamGridDB doesn't know.
+            if retrieve_status_dic['status'] and data is not None:
+                self.game_cache.put(game_key, data)
+                self.game_store.put('{}/{}'.format(data_type, candidate['id']),
+                                    {'data': data, 'validators': cached_entry['validators']})
+            return data, retrieve_status_dic
+
+        data, retrieve_status_dic = self.game_requests.run(game_key, retrieve)
+        if not retrieve_status_dic['status']:
+            status_dic.update(retrieve_status_dic)
+            return None
+        return data
+
+    # Returns the stored entry of a game and the time it was stored. The entry is a copy, the
+    # retrieval functions update the validators in it.
+    def _get_game_store_entry(self, data_type, game_id):
+        stored_entry = self.game_store.get_entry('{}/{}'.format(data_type, game_id))
+        if stored_entry is None:
+            return {'data': None, 'validators': {}}, 0
+        cached_entry, timestamp = stored_entry
+        # Entries migrated from the caches of older versions only hold the data.
+        if not isinstance(cached_entry, dict) or 'validators' not in cached_entry:
+            cached_entry = {'data': cached_entry, 'validators': {}}
+        cached_entry = {'data': cached_entry['data'], 'validators': dict(cached_entry['validators'])}
+        if data_type.startswith('assets') and isinstance(cached_entry['data'], list):
+            cached_entry['data'] = self._build_asset_index(cached_entry['data'])
+        return cached_entry, timestamp
+
+    # Buckets a list of assets by asset ID, so get_assets() only needs a dictionary lookup.
+    def _build_asset_index(self, asset_list):
+        asset_index = {asset_ID: [] for asset_ID in SteamGridDB.supported_asset_list}
+        for asset_data in asset_list:
+            asset_index.setdefault(asset_data['asset_ID'], []).append(asset_data)
+        return asset_index
+
+    # Runs the grids, heroes and logos requests in parallel under the shared API rate limiter.
+    # Every request gets its own copy of the status dictionary. When any of them fails the
+    # error is copied into status_dic and the whole call fails, same as the serial retrieval.
+    def _retrieve_assets_concurrently(self, asset_retrievers, candidate, status_dic, cached_entry):
+        leg_status_dics = [dict(status_dic) for _ in asset_retrievers]
+        with ThreadPoolExecutor(max_workers=len(asset_retrievers)) as executor:
+            futures = [
+                executor.submit(asset_retriever, candidate, leg_status_dic, cached_entry)
+                for asset_retriever, leg_status_dic in zip(asset_retrievers, leg_status_dics)
+            ]
+            asset_lists = [future.result() for future in futures]
+
+        for leg_status_dic in leg_status_dics:
+            if not leg_status_dic['status']:
+                status_dic.update(leg_status_dic)
+                return None
+        return asset_lists
+
+    # Assets of candidates resolved from a Steam app ID are retrieved by app ID, e.g.
+    # grids/steam/{appid}, the others by SteamGridDB game ID. The asset filter of the endpoint
+    # is added as query parameters.
+    def _get_assets_URL(self, asset_path, candidate):
+        if candidate.get('steam_app_id'):
+            url = '{}{}/steam/{}'.format(SteamGridDB.API_URL, asset_path, candidate['steam_app_id'])
+        else:
+            url = '{}{}/game/{}'.format(SteamGridDB.API_URL, asset_path, candidate['id'])
+        query_params = self.asset_filters[asset_path].get_query_params()
+        if not query_params: return url
+        return '{}?{}'.format(url, urlencode(query_params, safe=','))
+
+    def _retrieve_cover_assets(self, candidate, status_dic, cached_entry):
+        logger.debug('SteamGridDB._retrieve_cover_assets() Getting Covers...')
+        asset_list = self._retrieve_asset_list('grids', constants.ASSET_BOXFRONT_ID, candidate, status_dic, cached_entry)
+        if not status_dic['status']: return None
+        self._dump_json_debug('SteamGridDB_assets_covers.json', asset_list)
         logger.debug('SteamGridDB._retrieve_cover_assets() Found {} cover assets for candidate #{}'.format(
             len(asset_list), candidate['id']))
 
         return asset_list
     
-    def _retrieve_logo_assets(self, candidate, status_dic):
+    def _retrieve_logo_assets(self, candidate, status_dic, cached_entry):
         logger.debug('SteamGridDB._retrieve_logo_assets() Getting Logos...')
-        url = '{}logos/game/{}'.format(SteamGridDB.API_URL, candidate['id'])
-        json_data = self._retrieve_URL_as_JSON(url, status_dic)
+        asset_list = self._retrieve_asset_list('logos', constants.ASSET_CLEARLOGO_ID, candidate, status_dic, cached_entry)
         if not status_dic['status']: return None
-        self._dump_json_debug('SteamGridDB_assets_logos.json', json_data)
-
-        # --- Parse images page data ---
-        asset_list = []
-        for image_data in json_data['data']:
-            style = image_data['style'] if 'style' in image_data else 'image'
-            asset_data = self._new_assetdata_dic()
-            asset_data['asset_ID'] = constants.ASSET_CLEARLOGO_ID
-            asset_data['display_name'] = "{} by {}".format(style, image_data['author']['name'])
-            asset_data['url_thumb'] = image_data['thumb']
-            asset_data['url'] = image_data['url']
-            if self.verbose_flag: logger.debug('Found logo {0}'.format(asset_data['url_thumb']))
-            asset_list.append(asset_data)
-            
+        self._dump_json_debug('SteamGridDB_assets_logos.json', asset_list)
         logger.debug('SteamGridDB._retrieve_logo_assets() Found {} logo assets for candidate #{}'.format(
             len(asset_list), candidate['id']))
 
         return asset_list
     
-    def _retrieve_fanart_assets(self, candidate, status_dic):
+    def _retrieve_fanart_assets(self, candidate, status_dic, cached_entry):
         logger.debug('SteamGridDB._retrieve_fanart_assets() Getting Fanarts...')
-        url = '{}heroes/game/{}'.format(SteamGridDB.API_URL, candidate['id'])
-        json_data = self._retrieve_URL_as_JSON(url, status_dic)
+        asset_list = self._retrieve_asset_list('heroes', constants.ASSET_FANART_ID, candidate, status_dic, cached_entry)
         if not status_dic['status']: return None
-        self._dump_json_debug('SteamGridDB_assets_fanarts.json', json_data)
+        self._dump_json_debug('SteamGridDB_assets_fanarts.json', asset_list)
+        logger.debug('SteamGridDB._retrieve_fanart_assets() Found {} fanart assets for candidate #{}'.format(
+            len(asset_list), candidate['id']))
+
+        return asset_list
 
-        # --- Parse images page data ---
-        asset_list = []
-        for image_data in json_data['data']:
+    # Retrieves the images of an asset endpoint. Every image is turned into an asset as it is
+    # parsed and the images the asset filter rejects are skipped, up to the asset limit.
+    def _retrieve_asset_list(self, asset_path, asset_ID, candidate, status_dic, cached_entry):
+        asset_filter = self.asset_filters[asset_path]
+
+        def parse_image(image_data):
+            if not asset_filter.accepts(image_data): return None
             style = image_data['style'] if 'style' in image_data else 'image'
             asset_data = self._new_assetdata_dic()
-            asset_data['asset_ID'] = constants.ASSET_FANART_ID
+            asset_data['asset_ID'] = asset_ID
             asset_data['display_name'] = "{} by {}".format(style, image_data['author']['name'])
             asset_data['url_thumb'] = image_data['thumb']
             asset_data['url'] = image_data['url']
-            if self.verbose_flag: logger.debug('Found fanart {0}'.format(asset_data['url_thumb']))
-            asset_list.append(asset_data)
-            
-        logger.debug('SteamGridDB._retrieve_fanart_assets() Found {} fanart assets for candidate #{}'.format(
-            len(asset_list), candidate['id']))
+            if self.verbose_flag: logger.debug('Found {0} {1}'.format(asset_path, asset_data['url_thumb']))
+            return asset_data
 
+        url = self._get_assets_URL(asset_path, candidate)
+        asset_list = self._retrieve_URL_as_list(url, status_dic, parse_image, asset_filter.limit, cached_entry['validators'])
+        if not status_dic['status']: return None
+        if asset_list is NOT_MODIFIED: return cached_entry['data'][asset_ID]
         return asset_list
 
+    def flush_disk_cache(self, pdialog=None):
+        super(SteamGridDB, self).flush_disk_cache(pdialog)
+        self.search_cache.flush()
+        self.game_store.flush()
+        self.title_index.flush()
+        self.negative_cache.flush()
+        self.rescan_manifest.flush()
+        if self.image_store is not None: self.image_store.flush()
+        if self.cache_store is not None:
+            self.cache_store.commit()
+
+    # --- Disk cache with memory tier ------------------------------------------------------------
+    # Lookups go through the in memory LRU cache first and only fall back to the disk cache
+    # on a miss. Writes go to both, so the memory tier never holds stale data.
+    # Metadata and assets are persisted per game in the game store, for these cache types the
+    # disk cache per ROM only holds data cached by older versions and is never written. That
+    # data is moved into the game store on the first lookup, see _move_legacy_entry(), so the
+    # game cache TTL, revalidation and asset filters apply to it. With the SQLite store it was
+    # migrated already, so the disk cache is skipped completely.
+    def _check_disk_cache(self, cache_type, cache_key):
+        if self.memory_cache.get(self._get_memory_cache_key(cache_type, cache_key)) is not None:
+            self.metrics.add('disk_cache.{}.hits'.format(cache_type))
+            return True
+        if cache_type in SteamGridDB.GAME_CACHE_TYPES:
+            if self.cache_store is None: self._move_legacy_entry(cache_type, cache_key)
+            self.metrics.add('disk_cache.{}.misses'.format(cache_type))
+            return False
+        with self.metrics.time('disk_cache.check'):
+            is_cached = super(SteamGridDB, self)._check_disk_cache(cache_type, cache_key)
+        self.metrics.add('disk_cache.{}.{}'.format(cache_type, 'hits' if is_cached else 'misses'))
+        return is_cached
+
+    def _retrieve_from_disk_cache(self, cache_type, cache_key):
+        memory_key = self._get_memory_cache_key(cache_type, cache_key)
+        data = self.memory_cache.peek(memory_key)
+        if data is None:
+            with self.metrics.time('disk_cache.retrieve'):
+                data = super(SteamGridDB, self)._retrieve_from_disk_cache(cache_type, cache_key)
+            self.memory_cache.put(memory_key, data)
+        return data
+
+    def _update_disk_cache(self, cache_type, cache_key, data):
+        if cache_type not in SteamGridDB.GAME_CACHE_TYPES:
+            with self.metrics.time('disk_cache.update'):
+                super(SteamGridDB, self)._update_disk_cache(cache_type, cache_key, data)
+        self.memory_cache.put(self._get_memory_cache_key(cache_type, cache_key), data)
+
+    def _delete_from_disk_cache(self, cache_type, cache_key):
+        self.memory_cache.invalidate(self._get_memory_cache_key(cache_type, cache_key))
+        if cache_type in SteamGridDB.GAME_CACHE_TYPES and self.cache_store is not None:
+            return
+        super(SteamGridDB, self)._delete_from_disk_cache(cache_type, cache_key)
+
+    # Moves the metadata or assets an older version cached for a ROM into the game store, keyed
+    # by the game ID of the current candidate, unless the game store has the game already.
+    def _move_legacy_entry(self, cache_type, cache_key):
+        if not super(SteamGridDB, self)._check_disk_cache(cache_type, cache_key): return
+        data = super(SteamGridDB, self)._retrieve_from_disk_cache(cache_type, cache_key)
+        super(SteamGridDB, self)._delete_from_disk_cache(cache_type, cache_key)
+        if self.candidate is None or not self.candidate.get('id') or data is None: return
+        # Older versions cached the unfiltered assets.
+        data_type = 'metadata' if cache_type == Scraper.CACHE_METADATA else 'assets'
+        game_key = '{}/{}'.format(data_type, self.candidate['id'])
+        if self.game_store.get_entry(game_key) is not None: return
+        logger.debug('SteamGridDB._move_legacy_entry() Moving "{}" of "{}" to the game store'.format(cache_type, cache_key))
+        self.game_store.put(game_key, {'data': data, 'validators': {}})
+
+    def _get_memory_cache_key(self, cache_type, cache_key):
+        return (cache_type, self.platform, cache_key)
+
     # Retrieve URL and decode JSON object.
     # SteamGridDB API info https://www.steamgriddb.com/api/v2
     #
     # * When the API key is not configured or invalid SteamGridDB returns HTTP status code 401.
-    def _retrieve_URL_as_JSON(self, url, status_dic, retry=0):
-        self._wait_for_API_request(100)
-        page_data, http_code = net.get_URL(url, None, 
-                                            {"Authorization": f"Bearer {self.api_key}"}, 
-                                            content_type=net.ContentType.JSON)
+    # * HTTP status code 429 is retried by the transport with a shared backoff. It only
+    #   ends up here when all retries are used.
+    # * When a dictionary of validators is given, the ETag and Last-Modified of the previous
+    #   response of the URL are sent along and NOT_MODIFIED is returned when SteamGridDB
+    #   answers HTTP status code 304. The validators of a new response are stored in it.
+    def _retrieve_URL_as_JSON(self, url, status_dic, validators=None):
+        response = self._send_API_request(url, status_dic, validators, stream=False)
+        if response is None or response is NOT_MODIFIED: return response
+        self.metrics.add('bytes.api', len(response.body))
+
+        try:
+            with self.metrics.time('json_parse'):
+                json_data = response.json()
+        except ValueError as ex:
+            logger.error('SteamGridDB._retrieve_URL_as_JSON() Invalid JSON data', exc_info=ex)
+            self._handle_error(status_dic, 'Invalid JSON data returned by SteamGridDB')
+            return None
+
+        self._store_validators(url, response, validators)
+        return json_data
+
+    # Same as _retrieve_URL_as_JSON() for responses with a list of items in 'data'. The items
+    # are converted with parse_item(item) while the response is downloaded, so the whole JSON
+    # never sits in memory. Items for which parse_item() returns None are skipped. The
+    # download stops after 'limit' items, the connection is then dropped instead of reused.
+    # Returns the list of converted items, an empty list when the URL is not found,
+    # NOT_MODIFIED or None on errors.
+    def _retrieve_URL_as_list(self, url, status_dic, parse_item, limit=0, validators=None):
+        response = self._send_API_request(url, status_dic, validators, stream=True)
+        if response is None: return [] if status_dic['status'] else None
+        if response is NOT_MODIFIED: return NOT_MODIFIED
+
+        item_list = []
+        try:
+            with response, self.metrics.time('json_stream'):
+                for item in JsonListStream(response.iter_content()):
+                    parsed_item = parse_item(item)
+                    if parsed_item is None: continue
+                    item_list.append(parsed_item)
+                    if limit > 0 and len(item_list) >= limit: break
+        except ValueError as ex:
+            logger.error('SteamGridDB._retrieve_URL_as_list() Invalid JSON data', exc_info=ex)
+            self._handle_error(status_dic, 'Invalid JSON data returned by SteamGridDB')
+            return None
+        except OSError as ex:
+            logger.error('SteamGridDB._retrieve_URL_as_list() Exception while reading response', exc_info=ex)
+            self._handle_error(status_dic, 'Network error/exception while reading the SteamGridDB response')
+            return None
+        finally:
+            self.metrics.add('bytes.api', response.num_bytes)
+
+        self._store_validators(url, response, validators)
+        return item_list
+
+    # Sends an API request and checks the HTTP status. Returns the response when it is OK,
+    # NOT_MODIFIED or None. A streamed response is closed here unless it is returned.
+    def _send_API_request(self, url, status_dic, validators, stream):
+        headers = None
+        if validators is not None and url in validators:
+            headers = {}
+            if 'etag' in validators[url]: headers['If-None-Match'] = validators[url]['etag']
+            if 'last_modified' in validators[url]: headers['If-Modified-Since'] = validators[url]['last_modified']
+        with self.metrics.time('http.{}'.format(self._get_endpoint_name(url))):
+            if stream: response = self.transport.get_stream(url, headers)
+            else:      response = self.transport.get(url, headers)
         self.last_http_call = datetime.now()
 
+        # If response is None at this point is because of an exception in the transport.
+        if response is None:
+            self._handle_error(status_dic, 'Network error/exception in HttpTransport.get()')
+            return None
+
         # --- Check HTTP error codes ---
-        if http_code == 400:
+        http_code = response.status
+        self.metrics.add('http.status_{}'.format(http_code))
+        if http_code == 200: return response
+        if stream: response.close()
+        else:      self.metrics.add('bytes.api', len(response.body))
+
+        if http_code == 304:
+            logger.debug('SteamGridDB._send_API_request() HTTP status 304: not modified.')
+            return NOT_MODIFIED
+        elif http_code == 400:
             # Code 400 describes an error. See API description page.
-            logger.debug('SteamGridDB._retrieve_URL_as_JSON() HTTP status 400: general error.')
+            logger.debug('SteamGridDB._send_API_request() HTTP status 400: general error.')
             self._handle_error(status_dic, 'Bad HTTP status code {}'.format(http_code))
-            return None
-        elif http_code == 429 and retry < Scraper.RETRY_THRESHOLD:
-            logger.debug('SteamGridDB._retrieve_URL_as_JSON() HTTP status 429: Limit exceeded.')
-            # Number of requests limit, wait at least 2 minutes. Increments with every retry.
-            amount_seconds = 120*(retry+1)
-            wait_till_time = datetime.now() + timedelta(seconds=amount_seconds)
-            kodi.dialog_OK('You\'ve exceeded the max rate limit.', 
-                           'Respecting the website and we wait at least till {}.'.format(wait_till_time))
-            self._wait_for_API_request(amount_seconds*1000)
-            # waited long enough? Try again
-            retry_after_wait = retry + 1
-            return self._retrieve_URL_as_JSON(url, status_dic, retry_after_wait)
+        elif http_code == 429:
+            logger.debug('SteamGridDB._send_API_request() HTTP status 429: Limit exceeded.')
+            self._handle_error(status_dic, 'SteamGridDB rate limit exceeded. Try again later.')
         elif http_code == 404:
             # Code 404 means the Game was not found. Return None but do not mark
             # error in status_dic.
-            logger.debug('SteamGridDB._retrieve_URL_as_JSON() HTTP status 404: no candidates found.')
-            return None
-        elif http_code != 200:
+            logger.debug('SteamGridDB._send_API_request() HTTP status 404: no candidates found.')
+        else:
             # Unknown HTTP status code.
             self._handle_error(status_dic, 'Bad HTTP status code {}'.format(http_code))
-            return None
-        
-        # If page_data is None at this point is because of an exception in net_get_URL()
-        # which is not urllib2.HTTPError.
-        if page_data is None:
-            self._handle_error(status_dic, 'Network error/exception in net_get_URL()')
-            return None
+        return None
+
+    def _store_validators(self, url, response, validators):
+        if validators is None: return
+        response_headers = {key.lower(): value for key, value in response.headers.items()}
+        url_validators = {}
+        if 'etag' in response_headers: url_validators['etag'] = response_headers['etag']
+        if 'last-modified' in response_headers: url_validators['last_modified'] = response_headers['last-modified']
+        if url_validators: validators[url] = url_validators
+        else: validators.pop(url, None)
+
+    # Name of an API endpoint without the IDs, e.g. 'grids/game'. Used to group the metrics.
+    def _get_endpoint_name(self, url):
+        path = url[len(SteamGridDB.API_URL):] if url.startswith(SteamGridDB.API_URL) else urlsplit(url).path
+        return '/'.join(path.strip('/').split('/')[:2])
+
+    def _is_canceled(self) -> bool:
+        return self.pdialog is not None and self.pdialog.isCanceled()
 
-        return page_data
\ No newline at end of file
+    # Shows the rate limit backoff in the progress dialog instead of a blocking modal dialog.
+    def _report_backoff(self, wait_seconds):
+        logger.info('SteamGridDB rate limit exceeded. Waiting {:.0f} seconds.'.format(wait_seconds))
+        if self.pdialog is None: return
+        self.pdialog.updateMessage('SteamGridDB rate limit exceeded. Waiting {:.0f} seconds ...'.format(wait_seconds))
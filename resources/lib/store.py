@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# SQLite cache store for the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Namespaces of the cached data.
+NAMESPACE_SEARCH = 'search'
+NAMESPACE_GAMES = 'games'
+NAMESPACE_TITLES = 'titles'
+NAMESPACE_NEGATIVE = 'negative'
+NAMESPACE_MANIFEST = 'manifest'
+
+# Pending upserts are committed after this many writes or on flush().
+COMMIT_INTERVAL = 100
+
+
+# ------------------------------------------------------------------------------------------------
+# Single file cache database. All cached data lives in one table of JSON values, keyed by
+# namespace and key. Writes are incremental upserts instead of rewriting a whole JSON file
+# and the database runs in WAL mode, so other processes can read while a scan writes.
+# ------------------------------------------------------------------------------------------------
+class SQLiteCacheStore(object):
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.pending_writes = 0
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT data, timestamp FROM cache_entries WHERE namespace = ? AND key = ?',
+                (namespace, key)).fetchone()
+        if row is None: return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, namespace: str, key: str, data, timestamp: float):
+        self.put_many(namespace, [(key, data, timestamp)])
+
+    def put_many(self, namespace: str, entries: list):
+        with self._lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries (namespace, key, data, timestamp) VALUES (?, ?, ?, ?)',
+                [(namespace, key, json.dumps(data), timestamp) for key, data, timestamp in entries])
+            self._count_writes(len(entries))
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self.connection.execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (namespace, key))
+            self._count_writes(1)
+
+    def purge(self, namespace: str):
+        with self._lock:
+            self.connection.execute('DELETE FROM cache_entries WHERE namespace = ?', (namespace,))
+            self.commit()
+
+    # Returns all (key, data) pairs of a namespace.
+    def get_all(self, namespace: str) -> list:
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT key, data FROM cache_entries WHERE namespace = ?', (namespace,)).fetchall()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM cache_entries WHERE namespace = ?', (namespace,)).fetchone()[0]
+
+    # Deletes entries older than oldest_timestamp and keeps the newest max_entries entries.
+    def trim(self, namespace: str, oldest_timestamp: float = None, max_entries: int = 0):
+        with self._lock:
+            if oldest_timestamp is not None:
+                self.connection.execute(
+                    'DELETE FROM cache_entries WHERE namespace = ? AND timestamp < ?', (namespace, oldest_timestamp))
+            if max_entries > 0:
+                self.connection.execute(
+                    'DELETE FROM cache_entries WHERE namespace = ? AND key NOT IN '
+                    '(SELECT key FROM cache_entries WHERE namespace = ? ORDER BY timestamp DESC LIMIT ?)',
+                    (namespace, namespace, max_entries))
+            self.commit()
+
+    def commit(self):
+        with self._lock:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        with self._lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def get_setting(self, key: str):
+        with self._lock:
+            row = self.connection.execute('SELECT value FROM store_settings WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key: str, value: str):
+        with self._lock:
+            self.connection.execute('INSERT OR REPLACE INTO store_settings (key, value) VALUES (?, ?)', (key, value))
+            self.commit()
+
+    def _count_writes(self, num_writes: int):
+        self.pending_writes += num_writes
+        if self.pending_writes >= COMMIT_INTERVAL:
+            self.commit()
+
+    def _create_schema(self):
+        with self._lock:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, timestamp REAL NOT NULL, '
+                'PRIMARY KEY (namespace, key)) WITHOUT ROWID')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_cache_entries_timestamp ON cache_entries (namespace, timestamp)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS store_settings (key TEXT PRIMARY KEY, value TEXT)')
+            self.connection.execute(
+                'INSERT OR IGNORE INTO store_settings (key, value) VALUES (?, ?)',
+                ('schema_version', str(SQLiteCacheStore.SCHEMA_VERSION)))
+            self.connection.commit()
+
+
+# ------------------------------------------------------------------------------------------------
+# One namespace of a SQLiteCacheStore with the same interface as JsonFileCache.
+# ------------------------------------------------------------------------------------------------
+class SQLiteCache(object):
+    def __init__(self, store: SQLiteCacheStore, namespace: str, ttl: float, max_entries: int, clock=time.time):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+
+    def __len__(self):
+        return self.store.count(self.namespace)
+
+    def get(self, key: str, default=None):
+        entry = self.store.get(self.namespace, key)
+        if entry is None:
+            return default
+        data, timestamp = entry
+        if self.ttl > 0 and self._clock() - timestamp > self.ttl:
+            self.store.delete(self.namespace, key)
+            return default
+        return data
+
+    # Returns (data, timestamp) of an entry, also when it is expired, or None.
+    def get_entry(self, key: str):
+        return self.store.get(self.namespace, key)
+
+    # Returns all (key, data) pairs, also the expired ones.
+    def items(self) -> list:
+        return self.store.get_all(self.namespace)
+
+    def put(self, key: str, data):
+        self.store.put(self.namespace, key, data, self._clock())
+
+    def delete(self, key: str):
+        self.store.delete(self.namespace, key)
+
+    def purge(self):
+        self.store.purge(self.namespace)
+
+    def flush(self):
+        oldest_timestamp = self._clock() - self.ttl if self.ttl > 0 else None
+        self.store.trim(self.namespace, oldest_timestamp, self.max_entries)
+
+
+# ------------------------------------------------------------------------------------------------
+# Imports the JSON caches into a new SQLite store:
+# * The candidates, metadata and internal caches of the Scraper base class. These are keyed
+#   by ROM, so they are joined on the candidate to store them per game ID.
+# * The files written by JsonFileCache, one per namespace, with their stored timestamps. The
+#   game store file goes after the Scraper base class caches, so its newer data wins.
+# ------------------------------------------------------------------------------------------------
+JSON_CACHE_NAMESPACES = [
+    ('search', NAMESPACE_SEARCH),
+    ('games', NAMESPACE_GAMES),
+    ('titles', NAMESPACE_TITLES),
+    ('negative', NAMESPACE_NEGATIVE),
+    ('manifest', NAMESPACE_MANIFEST)
+]
+
+
+def migrate_json_caches(store: SQLiteCacheStore, cache_dir: str, scraper_filename: str):
+    if store.get_setting('json_migrated') is not None: return
+    now = time.time()
+
+    num_games = 0
+    for file_name in os.listdir(cache_dir):
+        if not file_name.startswith(scraper_filename) or not file_name.endswith('.json'): continue
+        if 'candidates' not in file_name: continue
+        candidates = _load_json_file(os.path.join(cache_dir, file_name))
+        for data_type, cache_type in [('metadata', 'metadata'), ('assets', 'internal')]:
+            rom_data = _load_json_file(os.path.join(cache_dir, file_name.replace('candidates', cache_type)))
+            game_entries = [
+                ('{}/{}'.format(data_type, candidates[rom_key]['id']), data, now)
+                for rom_key, data in rom_data.items()
+                if isinstance(candidates.get(rom_key), dict) and 'id' in candidates[rom_key]
+            ]
+            store.put_many(NAMESPACE_GAMES, game_entries)
+            num_games += len(game_entries)
+
+    num_entries = {}
+    for file_suffix, namespace in JSON_CACHE_NAMESPACES:
+        file_path = os.path.join(cache_dir, '{}_{}.json'.format(scraper_filename, file_suffix))
+        entries = [
+            (key, entry['data'], entry['timestamp']) for key, entry in _load_json_file(file_path).items()
+            if isinstance(entry, dict) and 'data' in entry and 'timestamp' in entry
+        ]
+        store.put_many(namespace, entries)
+        num_entries[namespace] = len(entries)
+
+    store.set_setting('json_migrated', str(now))
+    logger.info('migrate_json_caches() Migrated {} Scraper game entries and {}'.format(
+        num_games, ', '.join('{} {} entries'.format(count, namespace) for namespace, count in num_entries.items())))
+
+
+def _load_json_file(file_path: str) -> dict:
+    if not os.path.exists(file_path): return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as ex:
+        logger.error('Cannot load "{}" for migration'.format(file_path), exc_info=ex)
+        return {}
+    return data if isinstance(data, dict) else {}
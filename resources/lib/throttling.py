@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# Request throttling for the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import random
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Rate limit reset values above this are epoch timestamps instead of a number of seconds.
+EPOCH_THRESHOLD = 1000000000
+# A backoff is slept in slices of this many seconds, so a cancel is noticed in time.
+WAIT_SLICE = 1.0
+
+
+# ------------------------------------------------------------------------------------------------
+# Token bucket. Holds up to 'burst' tokens and refills them at 'rate' tokens per second.
+# Every request takes one token. When the bucket is empty the token is reserved ahead of time
+# and the caller sleeps until it becomes available, so concurrent callers are queued at exactly
+# the allowed rate. A rate of 0 disables the throttling.
+# ------------------------------------------------------------------------------------------------
+class TokenBucket(object):
+    def __init__(self, rate: float, burst: int, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    # Takes one token and blocks while over budget. Returns the number of seconds slept.
+    def acquire(self) -> float:
+        if self.rate <= 0: return 0.0
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            wait_seconds = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait_seconds > 0:
+            self._sleep(wait_seconds)
+        return wait_seconds
+
+
+# ------------------------------------------------------------------------------------------------
+# Keeps a token bucket per host. Hosts with an explicit limit (the JSON API) use that limit,
+# every other host (the image CDN) gets its own bucket with the default limit.
+# ------------------------------------------------------------------------------------------------
+class RateLimiter(object):
+    def __init__(self, default_rate: float, default_burst: int):
+        self.default_limit = (default_rate, default_burst)
+        self.host_limits = {}
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def set_host_limit(self, url: str, rate: float, burst: int):
+        host = self._get_host(url)
+        with self._lock:
+            self.host_limits[host] = (rate, burst)
+            self.buckets.pop(host, None)
+
+    # Blocks until a request to the URL is within budget. Returns the seconds slept.
+    def acquire(self, url: str) -> float:
+        wait_seconds = self._get_bucket(self._get_host(url)).acquire()
+        if wait_seconds > 0:
+            logger.debug('RateLimiter.acquire() Throttled {:.3f} seconds for "{}"'.format(
+                wait_seconds, self._get_host(url)))
+        return wait_seconds
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(host, self.default_limit)
+                bucket = TokenBucket(rate, burst)
+                self.buckets[host] = bucket
+            return bucket
+
+    def _get_host(self, url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+
+# Jittered exponential delay for retry number 'attempt' (starting at 0), capped at max_delay.
+# The delay is randomized between half and the full exponential value.
+def get_exponential_delay(attempt: int, base_delay: float, max_delay: float, jitter=random.random) -> float:
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay / 2 + delay / 2 * jitter()
+
+
+# ------------------------------------------------------------------------------------------------
+# Shared backoff after the server answered with HTTP 429. Tripping the gate pauses every request
+# that goes through wait(), so all workers back off together instead of each on their own.
+# The delay comes from the Retry-After or rate limit reset headers when the server sends them,
+# otherwise a jittered exponential delay is used. Both are capped at max_delay, so a server
+# asking for an hour does not stall an unattended scan for that long.
+# Once is_canceled() returns True, wait() stops sleeping and canceled() tells the transport to
+# stop retrying.
+# ------------------------------------------------------------------------------------------------
+class BackoffGate(object):
+    def __init__(self, base_delay: float = 5.0, max_delay: float = 120.0, on_wait=None,
+                 clock=time.time, sleep=time.sleep, jitter=random.random, is_canceled=None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_wait = on_wait
+        self.is_canceled = is_canceled
+        self.paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+        self._lock = threading.Lock()
+
+    def get_delay(self, attempt: int, headers: dict) -> float:
+        server_delay = self._parse_server_delay(headers)
+        if server_delay is not None:
+            if server_delay > self.max_delay:
+                logger.info('BackoffGate.get_delay() Server asks to wait {:.0f} seconds. Waiting the maximum of {:.0f} seconds.'.format(
+                    server_delay, self.max_delay))
+                return float(self.max_delay)
+            return server_delay
+        return get_exponential_delay(attempt, self.base_delay, self.max_delay, self._jitter)
+
+    # Pauses all requests for the delay belonging to this attempt. Returns the delay.
+    def trip(self, attempt: int, headers: dict) -> float:
+        delay = self.get_delay(attempt, headers)
+        with self._lock:
+            self.paused_until = max(self.paused_until, self._clock() + delay)
+        logger.debug('BackoffGate.trip() Rate limit reached. Pausing requests for {:.1f} seconds'.format(delay))
+        if self.on_wait is not None:
+            self.on_wait(delay)
+        return delay
+
+    # Blocks while the gate is tripped or until canceled. Returns the number of seconds slept.
+    def wait(self) -> float:
+        slept = 0.0
+        while True:
+            with self._lock:
+                remaining = self.paused_until - self._clock()
+            if remaining <= 0 or self.canceled():
+                return slept
+            sleep_seconds = min(remaining, WAIT_SLICE)
+            self._sleep(sleep_seconds)
+            slept += sleep_seconds
+
+    def canceled(self) -> bool:
+        return self.is_canceled is not None and self.is_canceled()
+
+    def _parse_server_delay(self, headers: dict):
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        retry_after = headers.get('retry-after')
+        if retry_after:
+            if retry_after.strip().isdigit():
+                return float(retry_after)
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return max(0.0, retry_at.timestamp() - self._clock())
+            except (TypeError, ValueError):
+                logger.debug('BackoffGate: Cannot parse Retry-After header "{}"'.format(retry_after))
+
+        reset = headers.get('x-ratelimit-reset') or headers.get('ratelimit-reset')
+        if reset:
+            try:
+                reset = float(reset)
+            except ValueError:
+                return None
+            # Some servers send an epoch timestamp, others the number of seconds left.
+            if reset > EPOCH_THRESHOLD:
+                return max(0.0, reset - self._clock())
+            return reset
+        return None
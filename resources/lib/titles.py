@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# Game title helpers for the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import re
+
+from datetime import datetime, timezone
+
+_PUNCTUATION_REGEX = re.compile(r'[\W_]+', re.UNICODE)
+# ROM file name noise: launcher and archive extensions, region and dump tags in brackets and
+# version suffixes like "v1.02", "ver 2" or "Rev A".
+_FILE_EXTENSION_REGEX = re.compile(r'\.(exe|lnk|url|bat|cmd|sh|desktop|zip|7z|rar|iso)$', re.IGNORECASE)
+_TAG_REGEX = re.compile(r'\([^)]*\)|\[[^\]]*\]|\{[^}]*\}')
+_VERSION_REGEX = re.compile(r'\b(?:v|ver|version)\s?\.?\d+(?:\.\d+)*[a-z]?\b|\brev\s?[a-z0-9]\b', re.IGNORECASE)
+_YEAR_REGEX = re.compile(r'[(\[]((?:19|20)\d{2})[)\]]')
+_ROMAN_NUMERALS = {
+    'i': '1', 'ii': '2', 'iii': '3', 'iv': '4', 'v': '5', 'vi': '6', 'vii': '7', 'viii': '8', 'ix': '9', 'x': '10'
+}
+
+# Score of a candidate whose title equals the search term. Ranking stops at such a candidate.
+EXACT_MATCH_SCORE = 1.0
+# Added to the score when the release year matches the year in the search term and
+# subtracted when they are further apart than one year.
+YEAR_SCORE = 0.1
+
+
+# Case folds a title and collapses all whitespace and punctuation into single spaces, so
+# "Sniper Elite III", "sniper-elite  iii" and "SNIPER ELITE: III" give the same key.
+def normalize_title(title: str) -> str:
+    return _PUNCTUATION_REGEX.sub(' ', title.casefold()).strip()
+
+
+# Removes ROM file name noise from a title but keeps its case and punctuation, so the result
+# can be used as search string. "Sniper Elite III (USA) [!] v1.02.exe" gives "Sniper Elite III".
+# When nothing is left the title is returned unchanged.
+def strip_title_noise(title: str) -> str:
+    stripped_title = _FILE_EXTENSION_REGEX.sub('', title.strip())
+    stripped_title = _TAG_REGEX.sub(' ', stripped_title)
+    stripped_title = _VERSION_REGEX.sub(' ', stripped_title)
+    stripped_title = ' '.join(stripped_title.split())
+    return stripped_title if _PUNCTUATION_REGEX.sub('', stripped_title) else title.strip()
+
+
+# Normalized title without ROM file name noise.
+def clean_title(title: str) -> str:
+    return normalize_title(strip_title_noise(title))
+
+
+# Returns the key of a title in the title index: the cleaned title with roman numerals
+# written as digits, so "Sniper Elite III" and "Sniper Elite 3" share one entry.
+def get_title_key(title: str) -> str:
+    return ' '.join(_ROMAN_NUMERALS.get(token, token) for token in clean_title(title).split())
+
+
+# Returns the year in brackets in a ROM name, e.g. "Doom (1993)", or None.
+def get_title_year(title: str):
+    match = _YEAR_REGEX.search(title)
+    return int(match.group(1)) if match else None
+
+
+# Set of words of a normalized title. Roman numerals are replaced by digits, so
+# "sniper elite iii" and "sniper elite 3" give the same set.
+def get_title_tokens(normalized_title: str) -> frozenset:
+    return frozenset(_ROMAN_NUMERALS.get(token, token) for token in normalized_title.split())
+
+
+# Ranks the games returned by a search on how well their name matches the search term.
+# The search term is cleaned and tokenized once. Every game is scored with the token set
+# similarity of the names (Dice coefficient) and the release year, when both are known.
+# A game with exactly the same name (and no conflicting year) is a confident pick: it goes
+# first and the remaining games are not scored, they follow in the order of the API.
+# Returns a list of (game, score) sorted from best to worst.
+def rank_games(search_term: str, games: list) -> list:
+    search_title = clean_title(search_term)
+    search_tokens = get_title_tokens(search_title)
+    search_year = get_title_year(search_term)
+
+    scored_games = []
+    for game_index, game in enumerate(games):
+        game_title = normalize_title(game.get('name', ''))
+        game_year = _get_release_year(game)
+        year_score = 0.0
+        if search_year is not None and game_year is not None:
+            if game_year == search_year: year_score = YEAR_SCORE
+            elif abs(game_year - search_year) > 1: year_score = -YEAR_SCORE
+
+        if game_title == search_title and year_score >= 0:
+            remaining_games = [(other_game, 0.0) for other_game in games[game_index + 1:]]
+            scored_games.sort(key=lambda scored_game: scored_game[1], reverse=True)
+            return [(game, EXACT_MATCH_SCORE + year_score)] + scored_games + remaining_games
+
+        game_tokens = get_title_tokens(game_title)
+        num_tokens = len(search_tokens) + len(game_tokens)
+        similarity = 2 * len(search_tokens & game_tokens) / num_tokens if num_tokens else 0.0
+        # Below an exact match, even when all tokens are equal but the order differs.
+        scored_games.append((game, min(similarity, EXACT_MATCH_SCORE - 0.01) + year_score))
+
+    scored_games.sort(key=lambda scored_game: scored_game[1], reverse=True)
+    return scored_games
+
+
+def _get_release_year(game: dict):
+    release_date = game.get('release_date')
+    if not release_date: return None
+    try:
+        return datetime.fromtimestamp(float(release_date), timezone.utc).year
+    except (ValueError, OverflowError, OSError):
+        return None
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# HTTP transport for the SteamGridDB scraper.
+
+# Copyright (c) 2020-2021 Chrisism
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+
+import logging
+import json
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from resources.lib.throttling import RateLimiter, BackoffGate, get_exponential_delay
+from resources.lib.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Default number of keep-alive connections kept open per host.
+POOL_SIZE = 10
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+STREAM_CHUNK_SIZE = 16 * 1024
+# Delays in seconds between retries of a failed download.
+DOWNLOAD_RETRY_DELAY = 1.0
+DOWNLOAD_MAX_RETRY_DELAY = 30.0
+
+
+class HttpResponse(object):
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+# Response of which the body is read in chunks while it is downloaded. Counts the bytes read.
+# Closing it before the body is read completely drops the connection.
+class HttpStreamResponse(object):
+    def __init__(self, response: requests.Response):
+        self.status = response.status_code
+        self.headers = dict(response.headers)
+        self.num_bytes = 0
+        self._response = response
+
+    # Raises OSError when the connection fails while reading.
+    def iter_content(self, chunk_size: int = STREAM_CHUNK_SIZE):
+        try:
+            for chunk in self._response.iter_content(chunk_size):
+                self.num_bytes += len(chunk)
+                yield chunk
+        except requests.exceptions.RequestException as ex:
+            raise OSError('Exception while reading the response: {}'.format(ex)) from ex
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class DownloadResult(object):
+    def __init__(self, url: str, file_path: str, num_bytes: int = None, attempts: int = 0):
+        self.url = url
+        self.file_path = file_path
+        self.num_bytes = num_bytes
+        self.attempts = attempts
+
+    @property
+    def success(self) -> bool:
+        return self.num_bytes is not None
+
+
+# ------------------------------------------------------------------------------------------------
+# Sends the scraper requests through the rate limiter and the shared backoff gate.
+# All requests share one keep-alive connection pool, so the TCP and TLS handshakes are only
+# done once per host for the lifetime of the transport.
+# A HTTP 429 trips the backoff gate and the request is retried in a loop, up to max_retries
+# times or until the backoff gate is canceled. After that the 429 response is returned to the
+# caller.
+# The headers, e.g. the API key, are only sent with the API requests of get() and
+# get_stream(). Downloads never send them, as images can be on any host.
+# A transport adapter can be given to replace the connection pool, e.g. to replay recorded
+# responses. Time slept for the rate limits, retries, downloads and bytes are counted in
+# 'metrics'.
+# ------------------------------------------------------------------------------------------------
+class HttpTransport(object):
+    def __init__(self, rate_limiter: RateLimiter, backoff: BackoffGate, headers: dict = None,
+                 max_retries: int = 5, timeout: float = 30, adapter: BaseAdapter = None,
+                 metrics: Metrics = None, pool_size: int = POOL_SIZE):
+        self.rate_limiter = rate_limiter
+        self.backoff = backoff
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.headers = dict(headers) if headers else {}
+
+        self.session = requests.Session()
+        if adapter is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    # Returns the HttpResponse or None when the request failed with a network error.
+    def get(self, url: str, headers: dict = None) -> HttpResponse:
+        response = self._request(url, self._get_api_headers(headers), stream=False)
+        if response is None: return None
+        return HttpResponse(response.status_code, dict(response.headers), response.content)
+
+    # Returns the HttpStreamResponse, which must be closed, or None when the request failed
+    # with a network error.
+    def get_stream(self, url: str, headers: dict = None) -> HttpStreamResponse:
+        response = self._request(url, self._get_api_headers(headers), stream=True)
+        if response is None: return None
+        return HttpStreamResponse(response)
+
+    # Streams the URL into a file. Returns the number of bytes written or None when failed.
+    # The data is written to a temporary file first so a failed download never leaves a
+    # partial image behind.
+    def download(self, url: str, file_path: str) -> int:
+        with self.metrics.time('http.download'):
+            num_bytes = self._download(url, file_path)
+        if num_bytes is not None: self.metrics.add('bytes.images', num_bytes)
+        return num_bytes
+
+    def _download(self, url: str, file_path: str) -> int:
+        response = self._request(url, None, stream=True)
+        if response is None: return None
+
+        temp_path = '{}.part'.format(file_path)
+        with response:
+            if response.status_code != 200:
+                logger.debug('HttpTransport.download() HTTP status {}'.format(response.status_code))
+                return None
+            num_bytes = 0
+            try:
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        num_bytes += len(chunk)
+                os.replace(temp_path, file_path)
+            except (requests.exceptions.RequestException, OSError) as ex:
+                logger.error('HttpTransport.download() Exception while downloading', exc_info=ex)
+                if os.path.exists(temp_path): os.remove(temp_path)
+                return None
+        return num_bytes
+
+    # Downloads a file and retries failures with a jittered exponential delay.
+    def download_with_retry(self, url: str, file_path: str, max_retries: int) -> DownloadResult:
+        result = DownloadResult(url, file_path)
+        while result.attempts <= max_retries:
+            if result.attempts > 0:
+                delay = get_exponential_delay(result.attempts - 1, DOWNLOAD_RETRY_DELAY, DOWNLOAD_MAX_RETRY_DELAY)
+                self.metrics.add('http.download_retries')
+                self.metrics.add('sleep.download_retry_s', delay)
+                logger.debug('HttpTransport.download_with_retry() Download failed. Retry after {:.1f} seconds'.format(delay))
+                time.sleep(delay)
+            result.attempts += 1
+            result.num_bytes = self.download(url, file_path)
+            if result.success: break
+        return result
+
+    # Downloads a list of (url, file_path) pairs with a bounded pool of workers. The requests
+    # still go through the per host rate limiter. Returns a DownloadResult for every pair,
+    # in the same order.
+    def download_many(self, download_list: list, max_workers: int, max_retries: int) -> list:
+        if not download_list: return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(download_list)))) as executor:
+            futures = [
+                executor.submit(self.download_with_retry, url, file_path, max_retries)
+                for url, file_path in download_list
+            ]
+            return [future.result() for future in futures]
+
+    def close(self):
+        self.session.close()
+
+    def _get_api_headers(self, headers: dict) -> dict:
+        api_headers = dict(self.headers)
+        if headers: api_headers.update(headers)
+        return api_headers
+
+    def _request(self, url: str, headers: dict, stream: bool) -> requests.Response:
+        attempt = 0
+        while True:
+            backoff_seconds = self.backoff.wait()
+            rate_limit_seconds = self.rate_limiter.acquire(url)
+            if backoff_seconds > 0: self.metrics.add('sleep.backoff_s', backoff_seconds)
+            if rate_limit_seconds > 0: self.metrics.add('sleep.rate_limit_s', rate_limit_seconds)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except requests.exceptions.RequestException as ex:
+                logger.error('HttpTransport._request() Exception in HTTP request', exc_info=ex)
+                self.metrics.add('http.network_errors')
+                return None
+            if response.status_code != 429 or attempt >= self.max_retries or self.backoff.canceled():
+                return response
+            logger.debug('HttpTransport._request() HTTP status 429. Retry {} of {}'.format(
+                attempt + 1, self.max_retries))
+            response.close()
+            self.metrics.add('http.429_retries')
+            self.backoff.trip(attempt, response.headers)
+            attempt += 1
@@ -0,0 +1,168 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper caches.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.cache import LRUCache, RequestCoalescer, JsonFileCache
+
+class Test_lru_cache(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        target = LRUCache(2, 1024)
+        target.put('a', 1)
+        target.put('b', 2)
+        target.get('a')
+
+        target.put('c', 3)
+
+        self.assertEqual(target.peek('a'), 1)
+        self.assertIsNone(target.peek('b'))
+        self.assertEqual(target.get_stats()['evictions'], 1)
+
+    def test_byte_limit_evicts_entries(self):
+        target = LRUCache(100, 15)
+        target.put('a', 'x' * 8)
+        target.put('b', 'y' * 8)
+
+        self.assertIsNone(target.peek('a'))
+        self.assertEqual(target.peek('b'), 'y' * 8)
+        self.assertEqual(target.get_stats()['bytes'], 10)
+
+    def test_entry_bigger_than_limit_is_not_cached(self):
+        target = LRUCache(100, 5)
+
+        target.put('a', 'x' * 10)
+
+        self.assertEqual(len(target), 0)
+
+    def test_hits_and_misses_are_counted(self):
+        target = LRUCache(10, 1024)
+        target.put('a', [1, 2, 3])
+
+        target.get('a')
+        target.get('b')
+        target.peek('a')
+
+        stats = target.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_invalidate_removes_entry(self):
+        target = LRUCache(10, 1024)
+        target.put('a', {'title': 'Sniper'})
+
+        target.invalidate('a')
+
+        self.assertIsNone(target.get('a'))
+        self.assertEqual(target.get_stats()['bytes'], 0)
+
+class Test_request_coalescer(unittest.TestCase):
+
+    def test_concurrent_lookups_share_one_fetch(self):
+        target = RequestCoalescer()
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            fetch_started.set()
+            release_fetch.wait(5)
+            return 'game data'
+
+        owner = threading.Thread(target=lambda: results.append(target.run(42, fetch)))
+        owner.start()
+        fetch_started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(target.run(42, fetch)))
+        follower.start()
+        # Give the follower time to join the in-flight fetch.
+        time.sleep(0.2)
+        release_fetch.set()
+        owner.join(5)
+        follower.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['game data', 'game data'])
+
+    def test_new_fetch_after_previous_finished(self):
+        target = RequestCoalescer()
+
+        target.run(42, lambda: 'first')
+        actual = target.run(42, lambda: 'second')
+
+        self.assertEqual(actual, 'second')
+        self.assertEqual(target.in_flight, {})
+
+class Test_json_file_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.file_path = os.path.join(tempfile.mkdtemp(), 'SteamGridDB_search.json')
+
+    def create_target(self, ttl=100, max_entries=10):
+        return JsonFileCache(self.file_path, ttl, max_entries, clock=lambda: self.now)
+
+    def test_entries_are_loaded_on_creation(self):
+        target = self.create_target()
+        target.put('sniper elite iii', [{'id': 1}])
+        target.flush()
+
+        actual = self.create_target()
+
+        self.assertEqual(actual.get('sniper elite iii'), [{'id': 1}])
+
+    def test_file_is_read_on_first_use(self):
+        target = self.create_target()
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            json.dump({'sniper elite iii': {'data': [{'id': 1}], 'timestamp': self.now}}, f)
+
+        self.assertEqual(target.get('sniper elite iii'), [{'id': 1}])
+
+    def test_expired_entries_are_dropped(self):
+        target = self.create_target(ttl=100)
+        target.put('sniper elite iii', [{'id': 1}])
+
+        self.now += 101
+
+        self.assertIsNone(target.get('sniper elite iii'))
+
+    def test_get_entry_returns_expired_entries(self):
+        target = self.create_target(ttl=100)
+        target.put('games/1', {'data': {'id': 1}, 'validators': {}})
+
+        self.now += 101
+
+        self.assertEqual(target.get_entry('games/1'), ({'data': {'id': 1}, 'validators': {}}, 1000.0))
+        self.assertIsNone(target.get_entry('games/2'))
+
+    def test_flush_keeps_newest_entries(self):
+        target = self.create_target(max_entries=2)
+        for key in ['a', 'b', 'c']:
+            target.put(key, [key])
+            self.now += 1
+
+        target.flush()
+
+        self.assertEqual(sorted(self.create_target().entries.keys()), ['b', 'c'])
+
+if __name__ == '__main__':
+    unittest.main()
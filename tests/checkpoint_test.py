@@ -0,0 +1,57 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scrape checkpoints.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.checkpoint import ScrapeCheckpoint
+
+class Test_scrape_checkpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = os.path.join(tempfile.mkdtemp(), 'SteamGridDB_checkpoints.json')
+
+    def test_committed_roms_are_resumed(self):
+        target = ScrapeCheckpoint(self.file_path, 'COLLECTION', 'abc')
+        target.commit(['rom1', 'rom2'])
+        target.commit(['rom3'])
+
+        actual = ScrapeCheckpoint(self.file_path, 'COLLECTION', 'abc')
+
+        self.assertEqual(len(actual), 3)
+        self.assertIn('rom2', actual)
+        self.assertNotIn('rom4', actual)
+
+    def test_checkpoints_are_kept_per_entity(self):
+        ScrapeCheckpoint(self.file_path, 'COLLECTION', 'abc').commit(['rom1'])
+        ScrapeCheckpoint(self.file_path, 'SOURCE', 'def').commit(['rom2'])
+
+        ScrapeCheckpoint(self.file_path, 'COLLECTION', 'abc').clear()
+
+        self.assertEqual(len(ScrapeCheckpoint(self.file_path, 'COLLECTION', 'abc')), 0)
+        self.assertIn('rom2', ScrapeCheckpoint(self.file_path, 'SOURCE', 'def'))
+
+    def test_broken_file_starts_over(self):
+        with open(self.file_path, 'w') as f:
+            f.write('{"COLLECTION/abc": [')
+
+        target = ScrapeCheckpoint(self.file_path, 'COLLECTION', 'abc')
+
+        self.assertEqual(len(target), 0)
+
+if __name__ == '__main__':
+    unittest.main()
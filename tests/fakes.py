@@ -1,5 +1,12 @@
 import os
+import json
 import random 
+import threading
+import time
+
+from unittest.mock import patch
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from akl.utils import io
 from akl.executors import ExecutorABC
@@ -92,4 +99,122 @@ class FakeProgressDialog(ProgressDialog):
     def isCanceled(self): return False
     def close(self): pass
     def endProgress(self): pass
-    def reopen(self): pass
\ No newline at end of file
+    def reopen(self): pass
+
+class FakeHTTPServer(object):
+    """
+    Local HTTP server returning scripted responses. Responses are registered per path and
+    served in order, the last one is repeated. Every received request is recorded.
+    Every response can be delayed by 'latency' seconds to simulate the network.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.responses = {}
+        self.requests = []
+        self.latency = latency
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests.append((self.path, dict(self.headers)))
+                    queue = fake.responses.get(self.path.split('?')[0], [(404, {}, b'')])
+                    status, headers, body = queue.pop(0) if len(queue) > 1 else queue[0]
+                if fake.latency > 0: time.sleep(fake.latency)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args): pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_url(self, path=''):
+        return 'http://127.0.0.1:{}/{}'.format(self.server.server_port, path)
+
+    def add_response(self, path, status=200, headers=None, body=b''):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        self.responses.setdefault(path, []).append((status, headers if headers else {}, body))
+
+    def count_requests(self, path):
+        return len([request for request in self.requests if request[0].split('?')[0] == path])
+
+class FakeSettings(object):
+    """
+    Replaces the akl settings functions with lookups in a dictionary. Starts with the
+    defaults of resources/settings.xml, except for test defaults which keep the tests fast
+    and offline: a test API key, no rate limits, a backoff of at most 1 second and no
+    prefetching. Tests update 'values' for other settings.
+    """
+    DEFAULTS = {
+        'scraper_steamgriddb_apikey': 'test',
+        'scraper_steamgriddb_concurrent_fetch': True,
+        'scraper_steamgriddb_api_rate': 0,
+        'scraper_steamgriddb_api_burst': 1,
+        'scraper_steamgriddb_cdn_rate': 0,
+        'scraper_steamgriddb_cdn_burst': 1,
+        'scraper_steamgriddb_max_backoff': 1,
+        'scraper_steamgriddb_download_workers': 4,
+        'scraper_steamgriddb_memory_cache_entries': 1000,
+        'scraper_steamgriddb_memory_cache_mb': 16,
+        'scraper_steamgriddb_search_cache_ttl': 30,
+        'scraper_steamgriddb_search_cache_size': 10000,
+        'scraper_steamgriddb_game_cache_ttl': 30,
+        'scraper_steamgriddb_negative_cache_ttl': 7,
+        'scraper_steamgriddb_image_store': True,
+        'scraper_steamgriddb_image_store_mb': 500,
+        'scraper_steamgriddb_use_sqlite': False,
+        'scraper_steamgriddb_prefetch_depth': 0,
+        'scraper_steamgriddb_title_index': True,
+        'scraper_steamgriddb_incremental_rescan': False,
+        'scraper_steamgriddb_store_batch_size': 0,
+        'scraper_steamgriddb_grid_styles': '',
+        'scraper_steamgriddb_grid_dimensions': '',
+        'scraper_steamgriddb_hero_styles': '',
+        'scraper_steamgriddb_hero_dimensions': '',
+        'scraper_steamgriddb_logo_styles': '',
+        'scraper_steamgriddb_asset_mimes': '',
+        'scraper_steamgriddb_asset_nsfw': 1,
+        'scraper_steamgriddb_asset_humor': 0,
+        'scraper_steamgriddb_asset_limit': 0,
+        'scraper_steamgriddb_metrics': False,
+        'scraper_steamgriddb_metrics_file': False,
+        'scraper_steamgriddb_transport_mode': 0,
+        'scraper_steamgriddb_fixture_dir': '',
+        'scraper_steamgriddb_replay_latency': 0,
+        'scraper_steamgriddb_replay_429_every': 0
+    }
+
+    def __init__(self, cache_dir: str, **values):
+        self.values = dict(FakeSettings.DEFAULTS)
+        self.values['scraper_cache_dir'] = cache_dir
+        self.values.update(values)
+        self.patchers = [
+            patch('akl.settings.getSetting', side_effect=self.values.get),
+            patch('akl.settings.getSettingAsBool', side_effect=self.values.get),
+            patch('akl.settings.getSettingAsInt', side_effect=self.values.get),
+            patch('akl.settings.getSettingAsFilePath', side_effect=self.get_file_path)
+        ]
+
+    def start(self):
+        for patcher in self.patchers: patcher.start()
+        return self
+
+    def stop(self):
+        for patcher in self.patchers: patcher.stop()
+
+    def get_file_path(self, key):
+        return io.FileName(self.values.get(key), isdir=True)
@@ -0,0 +1,117 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper asset filters.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.filters import AssetFilter, parse_filter_list, get_filters_signature
+from resources.lib.filters import FILTER_ANY, FILTER_EXCLUDE, FILTER_ONLY
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+def new_image(image_id, style='alternate', width=600, height=900, mime='image/png', nsfw=False, humor=False):
+    return {
+        'id': image_id, 'style': style, 'width': width, 'height': height, 'mime': mime,
+        'nsfw': nsfw, 'humor': humor, 'author': {'name': 'tester'},
+        'url': 'https://cdn2.steamgriddb.com/grid/{}.png'.format(image_id),
+        'thumb': 'https://cdn2.steamgriddb.com/grid_thumb/{}.png'.format(image_id)
+    }
+
+class Test_asset_filter(unittest.TestCase):
+
+    def test_parse_filter_list(self):
+        self.assertEqual(parse_filter_list(' Alternate, material ,,'), ['alternate', 'material'])
+        self.assertEqual(parse_filter_list(''), [])
+
+    def test_default_filter_sends_no_query_params(self):
+        target = AssetFilter()
+
+        self.assertEqual(target.get_query_params(), {})
+        self.assertIsNone(get_filters_signature({'grids': target, 'logos': AssetFilter()}))
+
+    def test_query_params(self):
+        target = AssetFilter(['alternate', 'material'], ['600x900'], ['image/png'], FILTER_ANY, FILTER_EXCLUDE, 10)
+
+        self.assertEqual(target.get_query_params(), {
+            'styles': 'alternate,material', 'dimensions': '600x900', 'mimes': 'image/png',
+            'nsfw': 'any', 'humor': 'false', 'limit': 10})
+
+    def test_accepts_enforces_filter(self):
+        target = AssetFilter(styles=['alternate'], dimensions=['600x900'], humor=FILTER_ONLY)
+        images = [
+            new_image(1, humor=True),
+            new_image(2, style='material', humor=True),
+            new_image(3, width=460, height=215, humor=True),
+            new_image(4, humor=True, nsfw=True),
+            new_image(5),
+            new_image(6, humor=True),
+            new_image(7, humor=True)
+        ]
+
+        actual = [image['id'] for image in images if target.accepts(image)]
+
+        self.assertEqual(actual, [1, 6, 7])
+
+class Test_scraper_asset_filters(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = FakeSettings(tempfile.mkdtemp(), scraper_steamgriddb_grid_styles='material').start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def test_filters_are_sent_and_enforced(self):
+        self.server.add_response('/api/v2/grids/game/5252', body={
+            'success': True, 'data': [new_image(1), new_image(2, style='material')]})
+        self.server.add_response('/api/v2/heroes/game/5252', body={'success': True, 'data': []})
+        self.server.add_response('/api/v2/logos/game/5252', body={'success': True, 'data': []})
+        target = SteamGridDB()
+        target.set_candidate('Sniper', 'Microsoft Windows', {'id': 5252, 'display_name': 'Sniper Elite III', 'order': 100})
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual([cover['url'] for cover in covers], ['https://cdn2.steamgriddb.com/grid/2.png'])
+        self.assertIn('/api/v2/grids/game/5252?styles=material', [path for path, _ in self.server.requests])
+
+    def test_parsing_stops_at_asset_limit(self):
+        self.settings.values['scraper_steamgriddb_grid_styles'] = ''
+        self.settings.values['scraper_steamgriddb_asset_limit'] = 2
+        self.server.add_response('/api/v2/grids/game/5252', body={
+            'success': True, 'data': [new_image(image_id) for image_id in range(10)]})
+        self.server.add_response('/api/v2/heroes/game/5252', body={'success': True, 'data': []})
+        self.server.add_response('/api/v2/logos/game/5252', body={'success': True, 'data': []})
+        target = SteamGridDB()
+        target.set_candidate('Sniper', 'Microsoft Windows', {'id': 5252, 'display_name': 'Sniper Elite III', 'order': 100})
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual(len(covers), 2)
+        self.assertIn('/api/v2/grids/game/5252?limit=2', [path for path, _ in self.server.requests])
+
+if __name__ == '__main__':
+    unittest.main()
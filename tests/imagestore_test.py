@@ -0,0 +1,96 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper image store.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.imagestore import ImageStore
+
+class Test_image_store(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = os.path.join(tempfile.mkdtemp(), 'SteamGridDB_images')
+        self.image_dir = tempfile.mkdtemp()
+        self.now = 1000.0
+
+    def write_image(self, name: str, data: bytes) -> str:
+        file_path = os.path.join(self.image_dir, name)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return file_path
+
+    def read_image(self, name: str) -> bytes:
+        with open(os.path.join(self.image_dir, name), 'rb') as f:
+            return f.read()
+
+    def new_store(self, max_bytes=0) -> ImageStore:
+        return ImageStore(self.store_dir, max_bytes, clock=lambda: self.now)
+
+    def test_stored_image_is_placed_for_another_rom(self):
+        target = self.new_store()
+        target.add('https://cdn/grid/1.png', self.write_image('rom1_boxfront.png', b'PNG1'))
+
+        actual = target.place('https://cdn/grid/1.png', os.path.join(self.image_dir, 'rom2_boxfront.png'))
+
+        self.assertEqual(actual, 4)
+        self.assertEqual(self.read_image('rom2_boxfront.png'), b'PNG1')
+        self.assertIsNone(target.place('https://cdn/grid/2.png', os.path.join(self.image_dir, 'rom3_boxfront.png')))
+
+    def test_rewriting_a_placed_image_changes_no_other_copy(self):
+        target = self.new_store()
+        target.add('https://cdn/grid/1.png', self.write_image('rom1_boxfront.png', b'PNG1'))
+        target.place('https://cdn/grid/1.png', os.path.join(self.image_dir, 'rom2_boxfront.png'))
+
+        self.write_image('rom1_boxfront.png', b'CUSTOM ART')
+
+        self.assertEqual(self.read_image('rom2_boxfront.png'), b'PNG1')
+        self.assertEqual(target.place('https://cdn/grid/1.png', os.path.join(self.image_dir, 'rom3_boxfront.png')), 4)
+        self.assertEqual(self.read_image('rom3_boxfront.png'), b'PNG1')
+
+    def test_same_content_is_stored_once(self):
+        target = self.new_store()
+        target.add('https://cdn/grid/1.png', self.write_image('rom1_boxfront.png', b'PNG1'))
+        target.add('https://cdn/grid/1_copy.png', self.write_image('rom2_boxfront.png', b'PNG1'))
+
+        self.assertEqual(len(target.blobs), 1)
+        self.assertEqual(target.get_size(), 4)
+
+    def test_index_is_kept_between_scans(self):
+        target = self.new_store()
+        target.add('https://cdn/grid/1.png', self.write_image('rom1_boxfront.png', b'PNG1'))
+        target.flush()
+
+        actual = self.new_store().place('https://cdn/grid/1.png', os.path.join(self.image_dir, 'rescan.png'))
+
+        self.assertEqual(actual, 4)
+
+    def test_least_recently_used_images_are_evicted(self):
+        target = self.new_store(max_bytes=8)
+        for image_number in range(3):
+            url = 'https://cdn/grid/{}.png'.format(image_number)
+            target.add(url, self.write_image('{}.png'.format(image_number), 'PNG{}'.format(image_number).encode()))
+            self.now += 1
+        target.place('https://cdn/grid/0.png', os.path.join(self.image_dir, 'again.png'))
+
+        target.flush()
+
+        self.assertEqual(target.get_size(), 8)
+        self.assertIsNone(target.place('https://cdn/grid/1.png', os.path.join(self.image_dir, 'evicted.png')))
+        self.assertEqual(self.read_image('1.png'), b'PNG1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper incremental JSON parsing.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import json
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.jsonstream import JsonListStream
+
+def split_chunks(data: bytes, chunk_size: int) -> list:
+    return [data[start:start + chunk_size] for start in range(0, len(data), chunk_size)]
+
+class Test_json_list_stream(unittest.TestCase):
+
+    def test_items_are_parsed_across_chunk_boundaries(self):
+        expected = {
+            'success': True,
+            'data': [{'id': image_id, 'author': {'name': 'Zoë'}, 'score': image_id / 2} for image_id in range(20)],
+            'page': 0
+        }
+        data = json.dumps(expected, ensure_ascii=False).encode('utf-8')
+
+        for chunk_size in [1, 7, 64, len(data)]:
+            target = JsonListStream(split_chunks(data, chunk_size))
+
+            self.assertEqual(list(target), expected['data'])
+            self.assertEqual(target.fields, {'success': True, 'page': 0})
+
+    def test_number_at_chunk_end_is_not_cut(self):
+        target = JsonListStream([b'{"data": [1, 2', b'3]}'])
+
+        self.assertEqual(list(target), [1, 23])
+
+    def test_iteration_stops_without_reading_the_rest(self):
+        chunks = iter([b'{"data": [{"id": 1}, ', b'{"id": 2}, ', b'{"id": 3}]}'])
+        target = iter(JsonListStream(chunks))
+
+        self.assertEqual(next(target), {'id': 1})
+        self.assertEqual(list(chunks), [b'{"id": 2}, ', b'{"id": 3}]}'])
+
+    def test_invalid_json_raises_value_error(self):
+        for data in [b'[1, 2]', b'{"data": [1, 2', b'{"data": [1 2]}']:
+            with self.assertRaises(ValueError):
+                list(JsonListStream([data]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper metrics.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import json
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.metrics import Metrics, Histogram
+
+class Test_metrics(unittest.TestCase):
+
+    def test_histogram_percentiles_use_bucket_bounds(self):
+        target = Histogram()
+        for seconds in [0.003] * 90 + [0.4] * 10:
+            target.record(seconds)
+
+        summary = target.get_summary()
+
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['p50_ms'], 5.0)
+        self.assertEqual(summary['p95_ms'], 500.0)
+        self.assertEqual(summary['buckets_ms'], {'<=5': 90, '<=500': 10})
+
+    def test_timings_and_counters_are_collected(self):
+        target = Metrics(enabled=True)
+
+        with target.time('http.games/id'):
+            pass
+        target.add('bytes.api', 100)
+        target.add('bytes.api', 50)
+
+        summary = target.get_summary()
+        self.assertEqual(summary['timings']['http.games/id']['count'], 1)
+        self.assertEqual(summary['counters'], {'bytes.api': 150})
+
+    def test_disabled_metrics_collect_nothing(self):
+        target = Metrics(enabled=False)
+
+        with target.time('http.games/id'):
+            pass
+        target.add('bytes.api', 100)
+        target.record_time('json_parse', 0.1)
+
+        self.assertEqual(target.histograms, {})
+        self.assertEqual(target.counters, {})
+
+    def test_dump_writes_json_file(self):
+        target = Metrics(enabled=True)
+        target.record_time('http.grids/game', 0.2)
+        file_path = os.path.join(tempfile.mkdtemp(), 'SteamGridDB_metrics.json')
+
+        target.dump(file_path)
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            actual = json.load(f)
+        self.assertEqual(actual['timings']['http.grids/game']['p50_ms'], 200.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper prefetch scheduler.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import tempfile
+import threading
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.prefetch import PrefetchScheduler, MAX_WORKERS
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+class Test_prefetch_scheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.prefetched = []
+        self.lock = threading.Lock()
+
+    def prefetch(self, item):
+        with self.lock:
+            self.prefetched.append(item)
+
+    def create_items(self, num_items):
+        return [('rom {}'.format(number), number) for number in range(num_items)]
+
+    def test_start_prefetches_lookahead_items(self):
+        target = PrefetchScheduler(self.prefetch, 3)
+
+        target.start(self.create_items(10))
+        target.join()
+
+        self.assertEqual(sorted(self.prefetched), [0, 1, 2])
+
+    def test_advance_moves_the_window(self):
+        target = PrefetchScheduler(self.prefetch, 3)
+        target.start(self.create_items(10))
+
+        target.join()
+        target.advance('rom 4')
+        target.advance('rom 2')
+        target.join()
+
+        self.assertEqual(sorted(self.prefetched), [0, 1, 2, 5, 6, 7])
+
+    def test_unknown_keys_are_ignored(self):
+        target = PrefetchScheduler(self.prefetch, 2)
+        target.start(self.create_items(5))
+
+        target.advance('other rom')
+        target.join()
+
+        self.assertEqual(sorted(self.prefetched), [0, 1])
+
+    def test_canceled_progress_stops_prefetching(self):
+        canceled = [False]
+        target = PrefetchScheduler(self.prefetch, 2, is_canceled=lambda: canceled[0])
+        target.start(self.create_items(10))
+        target.join()
+
+        canceled[0] = True
+        target.advance('rom 5')
+        target.join()
+
+        self.assertEqual(sorted(self.prefetched), [0, 1])
+        self.assertTrue(target.canceled)
+
+    def test_cancel_drops_items_not_started(self):
+        release = threading.Event()
+        def prefetch(item):
+            release.wait(5)
+            self.prefetch(item)
+        target = PrefetchScheduler(prefetch, 1)
+        target.start(self.create_items(10))
+        target.advance('rom 0')
+
+        target.cancel()
+        release.set()
+        target.shutdown()
+
+        self.assertEqual(self.prefetched, [0])
+
+    def test_errors_are_ignored(self):
+        def prefetch(item):
+            if item == 1: raise ValueError('Broken item')
+            self.prefetch(item)
+        target = PrefetchScheduler(prefetch, 3)
+
+        target.start(self.create_items(3))
+        target.join()
+
+        self.assertEqual(sorted(self.prefetched), [0, 2])
+
+class Test_scraper_prefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = FakeSettings(tempfile.mkdtemp(), scraper_steamgriddb_prefetch_depth=2).start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+        self.roms = []
+        for number in range(8):
+            self.server.add_response('/api/v2/search/autocomplete/Game+{}'.format(number), body={
+                'success': True, 'data': [{'id': 1000 + number, 'name': 'Game {}'.format(number)}]})
+            self.roms.append(ROMObj({
+                'id': 'rom{}'.format(number),
+                'scanned_data': {'identifier': 'Game {} (USA)'.format(number), 'file': '/roms/game{}.exe'.format(number)},
+                'platform': 'Microsoft Windows',
+                'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+                'asset_paths': {}
+            }))
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def test_cleaned_search_term_advances_the_window(self):
+        target = SteamGridDB()
+        target.start_prefetch(self.roms)
+        status_dic = kodi.new_status_dic('Prefetch test was OK')
+
+        target.get_candidates('Game 3', self.roms[3], 'Microsoft Windows', status_dic)
+        target.prefetcher.join()
+        target.stop_prefetch()
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual(self.server.count_requests('/api/v2/search/autocomplete/Game+5'), 1)
+        self.assertEqual(self.server.count_requests('/api/v2/search/autocomplete/Game+6'), 0)
+
+    def test_connection_pool_fits_prefetch_and_downloads(self):
+        self.settings.values['scraper_steamgriddb_download_workers'] = 8
+        target = SteamGridDB()
+
+        adapter = target.transport.session.get_adapter(SteamGridDB.API_URL)
+
+        self.assertEqual(adapter._pool_maxsize, (MAX_WORKERS + 1) * 3 + 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper record and replay transport.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.throttling import RateLimiter, BackoffGate
+from resources.lib.transport import HttpTransport
+from resources.lib.replay import FixtureStore, RecordingAdapter, ReplayAdapter
+
+from tests.fakes import FakeHTTPServer
+
+class Test_replay(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture_store = FixtureStore(tempfile.mkdtemp())
+        self.waits = []
+        self.backoff = BackoffGate(base_delay=0.01, max_delay=0.05, on_wait=self.waits.append)
+
+    def create_target(self, adapter):
+        return HttpTransport(RateLimiter(0, 1), self.backoff, max_retries=3, adapter=adapter)
+
+    def test_recorded_responses_are_replayed(self):
+        server = FakeHTTPServer().start()
+        server.add_response('/games/id/1', headers={'Content-Type': 'application/json', 'ETag': '"v1"'},
+                            body={'success': True, 'data': {'id': 1}})
+        server.add_response('/file/1.png', headers={'Content-Type': 'image/png'}, body=b'PNG')
+        recorder = self.create_target(RecordingAdapter(self.fixture_store))
+        recorder.get(server.get_url('games/id/1'))
+        recorder.get(server.get_url('file/1.png'))
+        server.stop()
+
+        target = self.create_target(ReplayAdapter(self.fixture_store))
+        game_response = target.get('https://www.steamgriddb.com/games/id/1')
+        image_response = target.get('https://cdn2.steamgriddb.com/file/1.png')
+
+        self.assertEqual(game_response.status, 200)
+        self.assertEqual(game_response.json()['data']['id'], 1)
+        self.assertEqual(image_response.body, b'PNG')
+
+    def test_replayed_download_is_written_to_file(self):
+        self.fixture_store.save('https://cdn2.steamgriddb.com/file/1.png', 200, {'Content-Type': 'image/png'}, b'PNG')
+        target = self.create_target(ReplayAdapter(self.fixture_store))
+        file_path = os.path.join(tempfile.mkdtemp(), '1.png')
+
+        actual = target.download('https://cdn2.steamgriddb.com/file/1.png', file_path)
+
+        self.assertEqual(actual, 3)
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), b'PNG')
+
+    def test_injected_429_goes_through_backoff(self):
+        self.fixture_store.save('https://www.steamgriddb.com/games/id/1', 200,
+                                {'Content-Type': 'application/json'}, b'{"success": true}')
+        target = self.create_target(ReplayAdapter(self.fixture_store, rate_limit_every=2, retry_after=0))
+
+        responses = [target.get('https://www.steamgriddb.com/games/id/1') for _ in range(2)]
+
+        self.assertEqual([response.status for response in responses], [200, 200])
+        self.assertEqual(self.waits, [0.0])
+
+    def test_matching_etag_returns_not_modified(self):
+        self.fixture_store.save('https://www.steamgriddb.com/games/id/1', 200,
+                                {'Content-Type': 'application/json', 'ETag': '"v1"'}, b'{"success": true}')
+        target = self.create_target(ReplayAdapter(self.fixture_store))
+
+        actual = target.get('https://www.steamgriddb.com/games/id/1', {'If-None-Match': '"v1"'})
+
+        self.assertEqual(actual.status, 304)
+
+    def test_missing_fixture_returns_404(self):
+        target = self.create_target(ReplayAdapter(self.fixture_store))
+
+        actual = target.get('https://www.steamgriddb.com/games/id/2')
+
+        self.assertEqual(actual.status, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the AKL SteamGridDB scraper against a local fake SteamGridDB server.
+#
+# Scrapes a synthetic library of ROMs the way ScrapeStrategy does (candidates, metadata,
+# assets and one image download per asset type) and reports throughput, per ROM latency,
+# request counts, cache hit ratio and peak RSS, for a cold and a warm cache.
+# The size of the library and the simulated network latency can be changed with the
+# BENCHMARK_ROMS and BENCHMARK_LATENCY_MS environment variables:
+#
+#   BENCHMARK_ROMS=500 BENCHMARK_LATENCY_MS=50 python -m pytest -s tests/scraper_benchmark_test.py
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+import logging
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi, io
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+NUM_ROMS = int(os.getenv('BENCHMARK_ROMS', '20'))
+LATENCY = int(os.getenv('BENCHMARK_LATENCY_MS', '0')) / 1000
+PLATFORM = 'Microsoft Windows'
+# Asset types of the API, with the number of images served per game.
+ASSET_PATHS = {'grids': 3, 'heroes': 2, 'logos': 2}
+
+
+def get_percentile(values: list, percentile: float) -> float:
+    if not values: return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def get_peak_rss_mb() -> float:
+    if resource is None: return 0.0
+    # Linux reports kilobytes, macOS bytes.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 / 1024 if os.uname().sysname == 'Darwin' else peak_rss / 1024
+
+
+class SyntheticLibrary(object):
+    """
+    Registers the responses of a library of num_roms games on the fake server. Every ROM
+    resolves to its own game.
+    """
+    def __init__(self, server: FakeHTTPServer, num_roms: int):
+        self.server = server
+        self.roms = []
+        for rom_number in range(num_roms):
+            game_id = 1000 + rom_number
+            title = 'Benchmark Game {}'.format(rom_number)
+            self.roms.append(ROMObj({
+                'id': 'rom{}'.format(rom_number),
+                'scanned_data': {'identifier': title, 'file': '/roms/{}.exe'.format(title)},
+                'platform': PLATFORM,
+                'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+                'asset_paths': {}
+            }))
+            self.add_game(game_id, title)
+
+    def add_game(self, game_id: int, title: str):
+        game = {'id': game_id, 'name': title, 'release_date': 1403568000}
+        self.server.add_response('/api/v2/search/autocomplete/{}'.format(title.replace(' ', '+')),
+                                 body={'success': True, 'data': [game]})
+        self.server.add_response('/api/v2/games/id/{}'.format(game_id), body={'success': True, 'data': game})
+        for asset_path, num_images in ASSET_PATHS.items():
+            images = []
+            for image_number in range(num_images):
+                image_path = 'cdn/{}/{}_{}.png'.format(asset_path, game_id, image_number)
+                images.append({
+                    'id': game_id * 10 + image_number, 'style': 'alternate', 'author': {'name': 'benchmark'},
+                    'url': self.server.get_url(image_path), 'thumb': self.server.get_url(image_path),
+                    'width': 600, 'height': 900, 'mime': 'image/png', 'nsfw': False, 'humor': False
+                })
+                self.server.add_response('/' + image_path, headers={'Content-Type': 'image/png'},
+                                         body=os.urandom(16 * 1024))
+            self.server.add_response('/api/v2/{}/game/{}'.format(asset_path, game_id),
+                                     body={'success': True, 'data': images})
+
+
+class ScraperBenchmark(object):
+    """
+    Scrapes all ROMs of a synthetic library with a new scraper instance and collects the
+    results of the run.
+    """
+    def __init__(self, server: FakeHTTPServer, library: SyntheticLibrary, cache_dir: str):
+        self.server = server
+        self.library = library
+        self.cache_dir = cache_dir
+        self.image_dir = tempfile.mkdtemp()
+
+    def run(self, name: str) -> dict:
+        num_requests_before = len(self.server.requests)
+        scraper = SteamGridDB()
+        scraper.start_prefetch(self.library.roms)
+        rom_times = []
+        start_time = time.perf_counter()
+        for rom in self.library.roms:
+            rom_start_time = time.perf_counter()
+            self.scrape_rom(scraper, rom)
+            rom_times.append(time.perf_counter() - rom_start_time)
+        scraper.stop_prefetch()
+        scraper.flush_disk_cache()
+        total_time = time.perf_counter() - start_time
+
+        requests = [path for path, _ in self.server.requests[num_requests_before:]]
+        api_requests = len([path for path in requests if path.startswith('/api/')])
+        # Every ROM needs one search, one game and one request per asset type without caches.
+        api_lookups = len(rom_times) * (2 + len(ASSET_PATHS))
+        results = {
+            'name': name,
+            'roms': len(rom_times),
+            'seconds': total_time,
+            'roms_per_minute': len(rom_times) / total_time * 60 if total_time > 0 else 0.0,
+            'p50_ms': get_percentile(rom_times, 50) * 1000,
+            'p95_ms': get_percentile(rom_times, 95) * 1000,
+            'api_requests': api_requests,
+            'image_requests': len([path for path in requests if path.startswith('/cdn/')]),
+            'cache_hit_ratio': 1 - api_requests / api_lookups if api_lookups else 0.0,
+            'peak_rss_mb': get_peak_rss_mb()
+        }
+        logger.info(
+            'Benchmark {name}: {roms} ROMs in {seconds:.2f} s, {roms_per_minute:.0f} ROMs/min, '
+            'p50 {p50_ms:.1f} ms, p95 {p95_ms:.1f} ms, {api_requests} API requests, '
+            '{image_requests} image requests, cache hit ratio {cache_hit_ratio:.2f}, '
+            'peak RSS {peak_rss_mb:.1f} MB'.format(**results))
+        return results
+
+    # Same calls as ScrapeStrategy makes for one ROM.
+    def scrape_rom(self, scraper: SteamGridDB, rom: ROMObj):
+        status_dic = kodi.new_status_dic('Benchmark was OK')
+        rom_key = rom.get_identifier()
+        search_term = rom.get_scanned_data_element('identifier')
+        if scraper.check_candidates_cache(rom_key, PLATFORM):
+            candidate = scraper._retrieve_from_disk_cache(SteamGridDB.CACHE_CANDIDATES, rom_key)
+        else:
+            candidates = scraper.get_candidates(search_term, rom, PLATFORM, status_dic)
+            candidate = candidates[0]
+        scraper.set_candidate(rom_key, PLATFORM, candidate)
+        scraper.get_metadata(status_dic)
+
+        download_list = []
+        for asset_id in SteamGridDB.supported_asset_list:
+            assets = scraper.get_assets(asset_id, status_dic)
+            if assets:
+                image_file = io.FileName(os.path.join(self.image_dir, '{}_{}.png'.format(rom_key, asset_id)))
+                download_list.append((scraper.resolve_asset_URL(assets[0], status_dic)[0], image_file))
+        scraper.download_images(download_list)
+        if not status_dic['status']:
+            raise AssertionError('Scraping "{}" failed: {}'.format(search_term, status_dic['msg']))
+
+
+class Test_scraper_benchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = FakeSettings(self.cache_dir).start()
+        self.server = FakeHTTPServer(latency=LATENCY).start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+        self.library = SyntheticLibrary(self.server, NUM_ROMS)
+        self.target = ScraperBenchmark(self.server, self.library, self.cache_dir)
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def test_cold_and_warm_cache(self):
+        cold = self.target.run('cold cache')
+        warm = self.target.run('warm cache')
+
+        self.assertEqual(cold['roms'], NUM_ROMS)
+        self.assertEqual(cold['api_requests'], NUM_ROMS * (2 + len(ASSET_PATHS)))
+        self.assertEqual(warm['api_requests'], 0)
+        self.assertEqual(warm['image_requests'], 0)
+
+    def test_sqlite_cold_and_warm_cache(self):
+        self.settings.values['scraper_steamgriddb_use_sqlite'] = True
+
+        cold = self.target.run('SQLite cold cache')
+        warm = self.target.run('SQLite warm cache')
+
+        self.assertEqual(cold['api_requests'], NUM_ROMS * (2 + len(ASSET_PATHS)))
+        self.assertEqual(warm['api_requests'], 0)
+
+    def test_json_cache_is_migrated_to_sqlite(self):
+        self.target.run('JSON cold cache')
+        self.settings.values['scraper_steamgriddb_use_sqlite'] = True
+
+        actual = self.target.run('SQLite after migration')
+
+        self.assertEqual(actual['api_requests'], 0)
+
+    def test_prefetch(self):
+        self.settings.values['scraper_steamgriddb_prefetch_depth'] = 5
+
+        actual = self.target.run('prefetch')
+
+        self.assertEqual(actual['api_requests'], NUM_ROMS * (2 + len(ASSET_PATHS)))
+
+    def test_serial_asset_fetch(self):
+        self.settings.values['scraper_steamgriddb_concurrent_fetch'] = False
+
+        actual = self.target.run('serial asset fetch')
+
+        self.assertEqual(actual['api_requests'], NUM_ROMS * (2 + len(ASSET_PATHS)))
+
+if __name__ == '__main__':
+    unittest.main()
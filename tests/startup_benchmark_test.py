@@ -0,0 +1,124 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Startup benchmark of the AKL SteamGridDB scraper.
+#
+# Kodi starts a new interpreter for every scrape, so the time until the first request matters
+# for scraping a single ROM. Reports the import time of the scraper in a new interpreter
+# without compiled files (cold) and with them (warm), and the time to create the scraper and
+# to answer the first search, with disk caches of BENCHMARK_CACHE_ENTRIES entries:
+#
+#   BENCHMARK_CACHE_ENTRIES=20000 python -m pytest -s tests/startup_benchmark_test.py
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+NUM_CACHE_ENTRIES = int(os.getenv('BENCHMARK_CACHE_ENTRIES', '2000'))
+PLATFORM = 'Microsoft Windows'
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SCRIPT = 'import time; start = time.perf_counter(); import resources.lib.scraper; ' \
+                'print(time.perf_counter() - start)'
+
+
+# Imports the scraper in a new interpreter and returns the seconds the import took. Compiled
+# files are written to and read from pycache_dir.
+def measure_import(pycache_dir: str) -> float:
+    env = dict(os.environ)
+    env['PYTHONPYCACHEPREFIX'] = pycache_dir
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT_DIR] + [path for path in [env.get('PYTHONPATH')] if path])
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT_DIR, env=env)
+    return float(output.decode('utf-8').strip().splitlines()[-1])
+
+
+# Writes JSON caches with num_entries search results and games, as left by earlier scans.
+def write_disk_caches(cache_dir: str, num_entries: int):
+    now = time.time()
+    games = {}
+    searches = {}
+    for number in range(num_entries):
+        game = {'id': 1000 + number, 'name': 'Cached Game {}'.format(number), 'release_date': 1403568000}
+        games['game/{}'.format(game['id'])] = {'data': {'data': game, 'validators': {}}, 'timestamp': now}
+        searches['cached game {}'.format(number)] = {'data': [game], 'timestamp': now}
+    for file_name, entries in [('SteamGridDB_games.json', games), ('SteamGridDB_search.json', searches),
+                               ('SteamGridDB_titles.json', searches), ('SteamGridDB_manifest.json', games)]:
+        with open(os.path.join(cache_dir, file_name), 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+
+
+class Test_startup_benchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = FakeSettings(self.cache_dir).start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+        game = {'id': 5252, 'name': 'Sniper Elite III', 'release_date': 1403568000}
+        self.server.add_response('/api/v2/search/autocomplete/Sniper+Elite+III', body={'success': True, 'data': [game]})
+        self.rom = ROMObj({
+            'id': 'rom1',
+            'scanned_data': {'identifier': 'Sniper Elite III', 'file': '/roms/Sniper Elite III.exe'},
+            'platform': PLATFORM,
+            'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+            'asset_paths': {}
+        })
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def test_cold_and_warm_import(self):
+        pycache_dir = tempfile.mkdtemp()
+
+        cold = measure_import(pycache_dir)
+        warm = measure_import(pycache_dir)
+
+        logger.info('Benchmark import: cold {:.1f} ms, warm {:.1f} ms'.format(cold * 1000, warm * 1000))
+        self.assertGreater(cold, 0)
+        self.assertGreater(warm, 0)
+
+    def test_first_request(self):
+        write_disk_caches(self.cache_dir, NUM_CACHE_ENTRIES)
+        status_dic = kodi.new_status_dic('Benchmark was OK')
+
+        start_time = time.perf_counter()
+        target = SteamGridDB()
+        init_time = time.perf_counter() - start_time
+        candidates = target.get_candidates('Sniper Elite III', self.rom, PLATFORM, status_dic)
+        first_request_time = time.perf_counter() - start_time
+
+        logger.info('Benchmark first request with {} cache entries: scraper created in {:.1f} ms, '
+                    'first search answered in {:.1f} ms'.format(
+                        NUM_CACHE_ENTRIES, init_time * 1000, first_request_time * 1000))
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual(candidates[0]['id'], 5252)
+        # A single ROM scrape never reads the rescan manifest.
+        self.assertIsNone(target.rescan_manifest._entries)
+
+if __name__ == '__main__':
+    unittest.main()
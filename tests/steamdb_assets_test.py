@@ -0,0 +1,151 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper retrieval of the grids, heroes and logos of a game.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import tempfile
+import unittest
+import logging
+
+from unittest.mock import patch
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi
+from akl.scrapers import Scraper
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+PLATFORM = 'Microsoft Windows'
+CANDIDATE = {'id': 5252, 'display_name': 'Sniper Elite III', 'order': 100}
+ASSET_PATHS = {'grids': 3, 'heroes': 2, 'logos': 1}
+
+def new_image(asset_path, image_id):
+    return {
+        'id': image_id, 'style': 'alternate', 'width': 600, 'height': 900, 'mime': 'image/png',
+        'nsfw': False, 'humor': False, 'author': {'name': 'tester'},
+        'url': 'https://cdn2.steamgriddb.com/{}/{}.png'.format(asset_path, image_id),
+        'thumb': 'https://cdn2.steamgriddb.com/{}_thumb/{}.png'.format(asset_path, image_id)
+    }
+
+class Test_steamdb_assets(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = FakeSettings(tempfile.mkdtemp()).start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def add_assets(self, failing_path=None):
+        for asset_path, num_images in ASSET_PATHS.items():
+            path = '/api/v2/{}/game/5252'.format(asset_path)
+            if asset_path == failing_path:
+                self.server.add_response(path, 500)
+                continue
+            self.server.add_response(path, body={
+                'success': True, 'data': [new_image(asset_path, image_id) for image_id in range(num_images)]})
+
+    def get_all_assets(self, status_dic):
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        return {asset_ID: target.get_assets(asset_ID, status_dic) for asset_ID in SteamGridDB.supported_asset_list}
+
+    def test_concurrent_assets_match_serial_assets(self):
+        self.add_assets()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        concurrent = self.get_all_assets(status_dic)
+        self.settings.stop()
+        self.settings = FakeSettings(tempfile.mkdtemp(), scraper_steamgriddb_concurrent_fetch=False).start()
+
+        serial = self.get_all_assets(status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual(concurrent, serial)
+        self.assertEqual([len(concurrent[asset_ID]) for asset_ID in SteamGridDB.supported_asset_list], [3, 1, 2])
+        self.assertEqual(self.server.count_requests('/api/v2/heroes/game/5252'), 2)
+
+    def test_failing_request_fails_the_call(self):
+        self.add_assets(failing_path='heroes')
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        actual = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+
+        self.assertIsNone(actual)
+        self.assertFalse(status_dic['status'])
+        self.assertEqual(self.server.count_requests('/api/v2/grids/game/5252'), 1)
+
+    def test_unsupported_asset_returns_before_any_lookup(self):
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        with patch.object(target, '_check_disk_cache') as check_disk_cache, \
+                patch.object(target, '_retrieve_game_assets') as retrieve_game_assets:
+            actual = target.get_assets(constants.ASSET_SNAP_ID, status_dic)
+
+        self.assertEqual(actual, [])
+        self.assertTrue(status_dic['status'])
+        check_disk_cache.assert_not_called()
+        retrieve_game_assets.assert_not_called()
+        self.assertEqual(self.server.requests, [])
+
+    def test_legacy_internal_cache_is_moved_to_game_store(self):
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        cover = {'asset_ID': constants.ASSET_BOXFRONT_ID, 'url': 'https://cdn2.steamgriddb.com/grids/1.png'}
+        logo = {'asset_ID': constants.ASSET_CLEARLOGO_ID, 'url': 'https://cdn2.steamgriddb.com/logos/1.png'}
+        Scraper._update_disk_cache(target, Scraper.CACHE_INTERNAL, 'Sniper', [cover, logo])
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        self.assertEqual(target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic), [cover])
+        self.assertEqual(target.get_assets(constants.ASSET_CLEARLOGO_ID, status_dic), [logo])
+        self.assertEqual(target.get_assets(constants.ASSET_FANART_ID, status_dic), [])
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(Scraper._check_disk_cache(target, Scraper.CACHE_INTERNAL, 'Sniper'))
+        self.assertEqual(target.game_store.get('assets/5252'), {'data': [cover, logo], 'validators': {}})
+
+    def test_legacy_internal_cache_is_not_used_with_filters(self):
+        self.settings.values['scraper_steamgriddb_grid_styles'] = 'material'
+        self.add_assets()
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        cover = {'asset_ID': constants.ASSET_BOXFRONT_ID, 'url': 'https://cdn2.steamgriddb.com/grids/legacy.png'}
+        Scraper._update_disk_cache(target, Scraper.CACHE_INTERNAL, 'Sniper', [cover])
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        actual = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+
+        self.assertEqual(actual, [])
+        self.assertEqual(self.server.count_requests('/api/v2/grids/game/5252'), 1)
+
+    def test_flat_list_in_game_store_is_bucketed(self):
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        cover = {'asset_ID': constants.ASSET_BOXFRONT_ID, 'url': 'https://cdn2.steamgriddb.com/grids/1.png'}
+        fanart = {'asset_ID': constants.ASSET_FANART_ID, 'url': 'https://cdn2.steamgriddb.com/heroes/1.png'}
+        target.game_store.put('assets/5252', [cover, fanart])
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        self.assertEqual(target.get_assets(constants.ASSET_FANART_ID, status_dic), [fanart])
+        self.assertEqual(target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic), [cover])
+        self.assertEqual(self.server.requests, [])
+
+if __name__ == '__main__':
+    unittest.main()
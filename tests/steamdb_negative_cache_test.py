@@ -0,0 +1,117 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper negative cache of searches and games without results.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+PLATFORM = 'Microsoft Windows'
+SEARCH_PATH = '/api/v2/search/autocomplete/Homebrew+Tool'
+ASSET_PATHS = ['/api/v2/grids/game/77', '/api/v2/heroes/game/77', '/api/v2/logos/game/77']
+
+class Test_steamdb_negative_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = FakeSettings(tempfile.mkdtemp()).start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+        self.rom = ROMObj({
+            'id': '1',
+            'scanned_data': {'identifier': 'Homebrew Tool', 'file': '/roms/tool.exe'},
+            'platform': PLATFORM,
+            'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+            'asset_paths': {}
+        })
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def search(self):
+        target = SteamGridDB()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        candidates = target.get_candidates('Homebrew Tool', self.rom, PLATFORM, status_dic)
+        target.flush_disk_cache()
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        return candidates
+
+    def get_covers(self):
+        target = SteamGridDB()
+        target.set_candidate('tool', PLATFORM, {'id': 77, 'display_name': 'Homebrew Tool', 'order': 100})
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+        target.flush_disk_cache()
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        return covers
+
+    def test_search_without_candidates_is_not_repeated(self):
+        self.assertEqual(self.search(), [])
+        self.assertEqual(self.search(), [])
+
+        self.assertEqual(self.server.count_requests(SEARCH_PATH), 1)
+
+    def test_purge_forgets_searches(self):
+        self.search()
+
+        num_entries = SteamGridDB().purge_negative_cache()
+        self.search()
+
+        self.assertEqual(num_entries, 1)
+        self.assertEqual(self.server.count_requests(SEARCH_PATH), 2)
+
+    def test_game_without_images_is_not_repeated(self):
+        for path in ASSET_PATHS:
+            self.server.add_response(path, body={'success': True, 'data': []})
+
+        self.assertEqual(self.get_covers(), [])
+        self.assertEqual(self.get_covers(), [])
+
+        self.assertEqual([self.server.count_requests(path) for path in ASSET_PATHS], [1, 1, 1])
+
+    def test_unknown_steam_app_id_is_not_repeated(self):
+        self.rom = ROMObj({
+            'id': '1',
+            'scanned_data': {'identifier': 'Homebrew Tool', 'file': '/roms/tool.exe', 'steam_app_id': '999'},
+            'platform': PLATFORM,
+            'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+            'asset_paths': {}
+        })
+
+        self.search()
+        target = SteamGridDB()
+        self.search()
+
+        self.assertEqual(self.server.count_requests('/api/v2/games/steam/999'), 1)
+        self.assertIsNone(target.game_store.get_entry('steam/999'))
+
+    def test_negative_cache_can_be_disabled(self):
+        self.settings.values['scraper_steamgriddb_negative_cache_ttl'] = 0
+
+        self.search()
+        self.search()
+
+        self.assertEqual(self.server.count_requests(SEARCH_PATH), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper against the recorded responses in tests/fixtures.
+# Runs without API key and without network access.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import json
+import glob
+import shutil
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from resources.lib.replay import MODE_REPLAY
+from akl.utils import kodi, io
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeSettings
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(TEST_DIR, 'fixtures', 'steamgriddb')
+
+class Test_steamdb_replay(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = FakeSettings(
+            self.cache_dir,
+            scraper_steamgriddb_transport_mode=MODE_REPLAY,
+            scraper_steamgriddb_fixture_dir=FIXTURE_DIR).start()
+        self.subject = ROMObj({
+            'id': '1234',
+            'scanned_data': {
+                'identifier': 'Sniper Elite III',
+                'file': '/roms/Sniper.exe'
+            },
+            'platform': 'Microsoft Windows',
+            'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+            'asset_paths': {}
+        })
+
+    def tearDown(self):
+        self.settings.stop()
+
+    def scrape_candidate(self, target, status_dic):
+        target.check_candidates_cache('Sniper', 'Microsoft Windows')
+        candidates = target.get_candidates('Sniper Elite III', self.subject, 'Microsoft Windows', status_dic)
+        target.set_candidate('Sniper', 'Microsoft Windows', candidates[0])
+        return candidates
+
+    def test_candidates_metadata_and_assets_are_replayed(self):
+        target = SteamGridDB()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        candidates = self.scrape_candidate(target, status_dic)
+        metadata = target.get_metadata(status_dic)
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+        logos = target.get_assets(constants.ASSET_CLEARLOGO_ID, status_dic)
+        fanarts = target.get_assets(constants.ASSET_FANART_ID, status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual(candidates[0]['id'], 5252)
+        self.assertEqual(metadata['title'], 'Sniper Elite III')
+        self.assertEqual(metadata['year'], 2014)
+        self.assertEqual([len(covers), len(logos), len(fanarts)], [2, 3, 1])
+
+    def test_injected_rate_limit_errors_are_retried(self):
+        self.settings.values['scraper_steamgriddb_replay_429_every'] = 3
+        target = SteamGridDB()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        self.scrape_candidate(target, status_dic)
+        target.get_metadata(status_dic)
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual(len(covers), 2)
+
+    def test_selected_candidate_is_resolved_from_title_index(self):
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        scraper = SteamGridDB()
+        self.scrape_candidate(scraper, status_dic)
+        scraper.flush_disk_cache()
+        export_path = os.path.join(self.cache_dir, 'titles.json')
+        SteamGridDB().export_title_index(export_path)
+        # Without fixtures every request would fail.
+        self.settings.values['scraper_steamgriddb_fixture_dir'] = tempfile.mkdtemp()
+        target = SteamGridDB()
+
+        candidates = target.get_candidates('Sniper Elite 3', self.subject, 'Microsoft Windows', status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual([candidate['id'] for candidate in candidates], [5252])
+        with open(export_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['titles']['sniper elite 3']['id'], 5252)
+
+    def test_title_index_is_imported(self):
+        import_path = os.path.join(self.cache_dir, 'import.json')
+        with open(import_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'titles': {'Sniper Elite III': 5252, 'Broken': 'x'}}, f)
+        self.settings.values['scraper_steamgriddb_fixture_dir'] = tempfile.mkdtemp()
+        target = SteamGridDB()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        num_titles = target.import_title_index(import_path)
+        candidates = target.get_candidates('Sniper Elite III', self.subject, 'Microsoft Windows', status_dic)
+
+        self.assertEqual(num_titles, 1)
+        self.assertEqual(candidates[0]['id'], 5252)
+
+    def test_steam_app_id_is_resolved_without_search(self):
+        # Only the responses of the Steam endpoints and the game itself, a search would fail.
+        fixture_dir = tempfile.mkdtemp()
+        for fixture_path in glob.glob(os.path.join(FIXTURE_DIR, '*_steam_238090_*')) + \
+                glob.glob(os.path.join(FIXTURE_DIR, 'api_v2_games_id_5252_*')):
+            shutil.copy(fixture_path, fixture_dir)
+        self.settings.values['scraper_steamgriddb_fixture_dir'] = fixture_dir
+        rom = ROMObj({
+            'id': '1235',
+            'scanned_data': {'identifier': 'Sniper 3 shortcut', 'file': 'steam://rungameid/238090'},
+            'platform': 'Microsoft Windows',
+            'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+            'asset_paths': {}
+        })
+        target = SteamGridDB()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+
+        target.check_candidates_cache('Sniper 3 shortcut', 'Microsoft Windows')
+        candidates = target.get_candidates('Sniper 3 shortcut', rom, 'Microsoft Windows', status_dic)
+        target.set_candidate('Sniper 3 shortcut', 'Microsoft Windows', candidates[0])
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        self.assertEqual([candidate['id'] for candidate in candidates], [5252])
+        self.assertEqual(candidates[0]['steam_app_id'], 238090)
+        self.assertEqual(len(covers), 2)
+
+    def test_replayed_image_is_downloaded(self):
+        target = SteamGridDB()
+        image_file = io.FileName(os.path.join(self.cache_dir, 'cover.png'))
+
+        results = target.download_images([('https://cdn2.steamgriddb.com/grid/101.png', image_file)])
+
+        self.assertTrue(results[0].success)
+        self.assertEqual(results[0].num_bytes, os.path.getsize(image_file.getPathTranslated()))
+
+if __name__ == '__main__':
+    unittest.main()
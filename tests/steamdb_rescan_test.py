@@ -0,0 +1,126 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper incremental rescans.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from resources.lib.replay import MODE_REPLAY
+from akl.utils import kodi, io
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeSettings
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(TEST_DIR, 'fixtures', 'steamgriddb')
+PLATFORM = 'Microsoft Windows'
+
+def new_rom(identifier: str) -> ROMObj:
+    return ROMObj({
+        'id': '1234',
+        'scanned_data': {'identifier': identifier, 'file': '/roms/Sniper.exe'},
+        'platform': PLATFORM,
+        'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+        'asset_paths': {}
+    })
+
+class Test_steamdb_rescan(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = FakeSettings(
+            self.cache_dir,
+            scraper_steamgriddb_transport_mode=MODE_REPLAY,
+            scraper_steamgriddb_fixture_dir=FIXTURE_DIR).start()
+        self.image_file = io.FileName(os.path.join(self.cache_dir, 'cover.png'))
+        self.rom = new_rom('Sniper Elite III')
+
+    def tearDown(self):
+        self.settings.stop()
+
+    # Same calls as ScrapeStrategy makes for the ROM, followed by the manifest update.
+    def scrape(self, scrape_settings=None):
+        target = SteamGridDB()
+        if scrape_settings is not None: target.set_scrape_settings(scrape_settings)
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        candidates = target.get_candidates('Sniper Elite III', self.rom, PLATFORM, status_dic)
+        target.set_candidate('Sniper Elite III', PLATFORM, candidates[0])
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+        target.download_image(covers[0]['url'], self.image_file)
+        target.record_scraped_rom(self.rom)
+        target.commit_scraped_roms()
+        target.flush_disk_cache()
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+
+    def test_scraped_rom_is_up_to_date(self):
+        self.assertFalse(SteamGridDB().is_rom_up_to_date(self.rom))
+
+        self.scrape()
+
+        self.assertTrue(SteamGridDB().is_rom_up_to_date(self.rom))
+
+    def test_rom_is_rescraped_with_other_scrape_settings(self):
+        self.scrape({'asset_IDs_to_scrape': [constants.ASSET_BOXFRONT_ID]})
+        target = SteamGridDB()
+
+        target.set_scrape_settings({'asset_IDs_to_scrape': [constants.ASSET_BOXFRONT_ID]})
+        self.assertTrue(target.is_rom_up_to_date(self.rom))
+        target.set_scrape_settings({'asset_IDs_to_scrape': [constants.ASSET_BOXFRONT_ID, constants.ASSET_FANART_ID]})
+        self.assertFalse(target.is_rom_up_to_date(self.rom))
+
+    def test_rom_not_saved_is_rescraped(self):
+        target = SteamGridDB()
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        candidates = target.get_candidates('Sniper Elite III', self.rom, PLATFORM, status_dic)
+        target.set_candidate('Sniper Elite III', PLATFORM, candidates[0])
+        target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+        target.record_scraped_rom(self.rom)
+        target.flush_disk_cache()
+
+        self.assertFalse(SteamGridDB().is_rom_up_to_date(self.rom))
+
+    def test_rom_with_missing_image_is_rescraped(self):
+        self.scrape()
+
+        os.remove(self.image_file.getPathTranslated())
+
+        self.assertFalse(SteamGridDB().is_rom_up_to_date(self.rom))
+
+    def test_renamed_rom_is_rescraped(self):
+        self.scrape()
+
+        self.assertFalse(SteamGridDB().is_rom_up_to_date(new_rom('Sniper Elite 4')))
+
+    def test_rom_with_changed_assets_is_rescraped(self):
+        self.scrape()
+        target = SteamGridDB()
+        target.game_store.put('assets/5252', {'data': target._build_asset_index([]), 'validators': {}})
+
+        self.assertFalse(target.is_rom_up_to_date(self.rom))
+
+    def test_rom_with_expired_assets_is_rescraped(self):
+        self.settings.values['scraper_steamgriddb_game_cache_ttl'] = 1
+        self.scrape()
+        target = SteamGridDB()
+        data, timestamp = target.game_store.get_entry('assets/5252')
+        target.game_store.entries['assets/5252']['timestamp'] = timestamp - 2 * 24 * 60 * 60
+
+        self.assertFalse(target.is_rom_up_to_date(self.rom))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper conditional revalidation of stale game data.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB, SECONDS_PER_DAY
+from akl.utils import kodi
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+PLATFORM = 'Microsoft Windows'
+CANDIDATE = {'id': 5252, 'display_name': 'Sniper Elite III', 'order': 100}
+GRIDS_PATH = '/api/v2/grids/game/5252'
+
+def new_image(image_id):
+    return {
+        'id': image_id, 'style': 'alternate', 'width': 600, 'height': 900, 'mime': 'image/png',
+        'nsfw': False, 'humor': False, 'author': {'name': 'tester'},
+        'url': 'https://cdn2.steamgriddb.com/grid/{}.png'.format(image_id),
+        'thumb': 'https://cdn2.steamgriddb.com/grid_thumb/{}.png'.format(image_id)
+    }
+
+class Test_steamdb_revalidation(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = FakeSettings(self.cache_dir).start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+        self.server.add_response(GRIDS_PATH, headers={'ETag': '"grids-v1"'},
+                                 body={'success': True, 'data': [new_image(1), new_image(2)]})
+        self.server.add_response(GRIDS_PATH, 304, {'ETag': '"grids-v1"'})
+        for asset_path in ['heroes', 'logos']:
+            self.server.add_response('/api/v2/{}/game/5252'.format(asset_path), body={'success': True, 'data': []})
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def get_covers(self):
+        target = SteamGridDB()
+        target.set_candidate('Sniper', PLATFORM, CANDIDATE)
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        covers = target.get_assets(constants.ASSET_BOXFRONT_ID, status_dic)
+        target.flush_disk_cache()
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        return covers
+
+    def load_game_store(self):
+        with open(os.path.join(self.cache_dir, 'SteamGridDB_games.json'), 'r') as f:
+            return json.load(f)
+
+    def age_game_store(self, days):
+        game_store = self.load_game_store()
+        for entry in game_store.values():
+            entry['timestamp'] -= days * SECONDS_PER_DAY
+        with open(os.path.join(self.cache_dir, 'SteamGridDB_games.json'), 'w') as f:
+            json.dump(game_store, f)
+
+    def test_validators_are_stored(self):
+        self.get_covers()
+
+        validators = self.load_game_store()['assets/5252']['data']['validators']
+
+        self.assertEqual(validators[self.server.get_url(GRIDS_PATH[1:])], {'etag': '"grids-v1"'})
+
+    def test_stale_entry_is_revalidated(self):
+        expected = self.get_covers()
+        self.age_game_store(31)
+        aged_timestamp = self.load_game_store()['assets/5252']['timestamp']
+
+        actual = self.get_covers()
+
+        grids_requests = [headers for path, headers in self.server.requests if path == GRIDS_PATH]
+        self.assertEqual(len(grids_requests), 2)
+        self.assertNotIn('If-None-Match', grids_requests[0])
+        self.assertEqual(grids_requests[1]['If-None-Match'], '"grids-v1"')
+        self.assertEqual([cover['url'] for cover in actual], [cover['url'] for cover in expected])
+        self.assertEqual(len(actual), 2)
+        self.assertGreater(self.load_game_store()['assets/5252']['timestamp'], aged_timestamp)
+
+    def test_fresh_entry_is_not_revalidated(self):
+        self.get_covers()
+
+        self.get_covers()
+
+        self.assertEqual(self.server.count_requests(GRIDS_PATH), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper title index of automatic and manual candidate selections.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.scraper import SteamGridDB
+from akl.utils import kodi
+from akl.api import ROMObj
+from akl import constants
+
+from tests.fakes import FakeHTTPServer, FakeSettings
+
+PLATFORM = 'Microsoft Windows'
+SEARCH_PATH = '/api/v2/search/autocomplete/Sniper+Elite'
+GAMES = [
+    {'id': 5252, 'name': 'Sniper Elite III', 'release_date': 1403568000},
+    {'id': 1515, 'name': 'Sniper Elite', 'release_date': 1127779200}
+]
+
+class Test_steamdb_title_index(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = FakeSettings(tempfile.mkdtemp()).start()
+        self.server = FakeHTTPServer().start()
+        self.api_url = SteamGridDB.API_URL
+        SteamGridDB.API_URL = self.server.get_url('api/v2/')
+        self.rom = ROMObj({
+            'id': '1',
+            'scanned_data': {'identifier': 'Sniper Elite', 'file': '/roms/Sniper Elite.exe'},
+            'platform': PLATFORM,
+            'assets': {key: '' for key in constants.ROM_ASSET_ID_LIST},
+            'asset_paths': {}
+        })
+
+    def tearDown(self):
+        SteamGridDB.API_URL = self.api_url
+        self.server.stop()
+        self.settings.stop()
+
+    def get_candidates(self, target):
+        status_dic = kodi.new_status_dic('Scraper test was OK')
+        target.check_candidates_cache(self.rom.get_identifier(), PLATFORM)
+        candidates = target.get_candidates('Sniper Elite', self.rom, PLATFORM, status_dic)
+        self.assertTrue(status_dic['status'], 'Status error "{}"'.format(status_dic['msg']))
+        return candidates
+
+    def test_poor_automatic_pick_is_not_indexed(self):
+        self.server.add_response(SEARCH_PATH, body={'success': True, 'data': GAMES[:1]})
+        target = SteamGridDB()
+
+        candidates = self.get_candidates(target)
+        target.set_candidate(self.rom.get_identifier(), PLATFORM, candidates[0])
+
+        self.assertLess(candidates[0]['order'], SteamGridDB.EXACT_MATCH_ORDER)
+        self.assertIsNone(target.title_index.get('sniper elite'))
+
+    def test_manual_search_skips_and_replaces_indexed_pick(self):
+        self.server.add_response(SEARCH_PATH, body={'success': True, 'data': GAMES})
+        target = SteamGridDB()
+        target.title_index.put('sniper elite', {'id': 5252, 'name': 'Sniper Elite III'})
+        target.set_manual_selection(True)
+
+        candidates = self.get_candidates(target)
+        picked = [candidate for candidate in candidates if candidate['id'] == 1515][0]
+        target.set_candidate(self.rom.get_identifier(), PLATFORM, picked)
+
+        self.assertEqual(sorted(candidate['id'] for candidate in candidates), [1515, 5252])
+        self.assertEqual(self.server.count_requests(SEARCH_PATH), 1)
+        self.assertEqual(target.title_index.get('sniper elite')['id'], 1515)
+
+if __name__ == '__main__':
+    unittest.main()
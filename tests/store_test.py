@@ -0,0 +1,106 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper SQLite cache store.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import json
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.store import SQLiteCacheStore, SQLiteCache, NAMESPACE_SEARCH, NAMESPACE_GAMES, NAMESPACE_TITLES
+from resources.lib.store import NAMESPACE_NEGATIVE, NAMESPACE_MANIFEST, migrate_json_caches
+
+class Test_sqlite_store(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.store = SQLiteCacheStore(os.path.join(self.cache_dir, 'SteamGridDB.db'))
+        self.now = 1000.0
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_put_upserts_entries(self):
+        self.store.put(NAMESPACE_GAMES, 'metadata/1', {'title': 'Old'}, 10)
+        self.store.put(NAMESPACE_GAMES, 'metadata/1', {'title': 'New'}, 20)
+
+        actual = self.store.get(NAMESPACE_GAMES, 'metadata/1')
+
+        self.assertEqual(actual, ({'title': 'New'}, 20))
+        self.assertEqual(self.store.count(NAMESPACE_GAMES), 1)
+
+    def test_namespaces_are_separated(self):
+        self.store.put(NAMESPACE_SEARCH, 'sniper', [1], 10)
+
+        self.assertIsNone(self.store.get(NAMESPACE_GAMES, 'sniper'))
+
+    def test_items_returns_entries_of_namespace(self):
+        target = SQLiteCache(self.store, NAMESPACE_TITLES, 0, 0)
+        target.put('sniper elite 3', {'id': 5252})
+        self.store.put(NAMESPACE_SEARCH, 'sniper', [1], 10)
+
+        self.assertEqual(target.items(), [('sniper elite 3', {'id': 5252})])
+
+    def test_cache_drops_expired_entries(self):
+        target = SQLiteCache(self.store, NAMESPACE_SEARCH, 100, 0, clock=lambda: self.now)
+        target.put('sniper elite iii', [{'id': 1}])
+
+        self.now += 101
+
+        self.assertIsNone(target.get('sniper elite iii'))
+
+    def test_flush_keeps_newest_entries(self):
+        target = SQLiteCache(self.store, NAMESPACE_SEARCH, 0, 2, clock=lambda: self.now)
+        for key in ['a', 'b', 'c']:
+            target.put(key, [key])
+            self.now += 1
+
+        target.flush()
+
+        self.assertEqual(len(target), 2)
+        self.assertIsNone(target.get('a'))
+
+    def test_migrate_json_caches(self):
+        self.write_json('SteamGridDB_search.json', {'sniper elite iii': {'data': [{'id': 1}], 'timestamp': 5}})
+        self.write_json('SteamGridDB__windows__candidates.json', {'Sniper': {'id': 1}})
+        self.write_json('SteamGridDB__windows__metadata.json', {'Sniper': {'title': 'Sniper Elite III'}})
+        self.write_json('SteamGridDB__windows__internal.json', {'Sniper': [{'asset_ID': 'boxfront'}]})
+
+        migrate_json_caches(self.store, self.cache_dir, 'SteamGridDB')
+
+        self.assertEqual(self.store.get(NAMESPACE_SEARCH, 'sniper elite iii')[0], [{'id': 1}])
+        self.assertEqual(self.store.get(NAMESPACE_GAMES, 'metadata/1')[0], {'title': 'Sniper Elite III'})
+        self.assertEqual(self.store.get(NAMESPACE_GAMES, 'assets/1')[0], [{'asset_ID': 'boxfront'}])
+        self.assertIsNotNone(self.store.get_setting('json_migrated'))
+
+    def test_migrate_json_file_caches(self):
+        self.write_json('SteamGridDB_games.json', {'game/1': {'data': {'data': {'id': 1}, 'validators': {}}, 'timestamp': 7}})
+        self.write_json('SteamGridDB_titles.json', {'sniper elite 3': {'data': {'id': 1}, 'timestamp': 8}})
+        self.write_json('SteamGridDB_negative.json', {'search/unknown': {'data': True, 'timestamp': 9}})
+        self.write_json('SteamGridDB_manifest.json', {'rom1': {'data': {'game_id': 1}, 'timestamp': 10}})
+
+        migrate_json_caches(self.store, self.cache_dir, 'SteamGridDB')
+
+        self.assertEqual(self.store.get(NAMESPACE_GAMES, 'game/1'), ({'data': {'id': 1}, 'validators': {}}, 7))
+        self.assertEqual(self.store.get(NAMESPACE_TITLES, 'sniper elite 3'), ({'id': 1}, 8))
+        self.assertEqual(self.store.get(NAMESPACE_NEGATIVE, 'search/unknown'), (True, 9))
+        self.assertEqual(self.store.get(NAMESPACE_MANIFEST, 'rom1'), ({'game_id': 1}, 10))
+
+    def write_json(self, file_name, data):
+        with open(os.path.join(self.cache_dir, file_name), 'w') as f:
+            json.dump(data, f)
+
+if __name__ == '__main__':
+    unittest.main()
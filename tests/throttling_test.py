@@ -0,0 +1,86 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper request throttling.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.throttling import TokenBucket, RateLimiter
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class Test_throttling(unittest.TestCase):
+
+    def test_burst_is_not_throttled(self):
+        fake = FakeClock()
+        target = TokenBucket(10, 5, fake.clock, fake.sleep)
+
+        waits = [target.acquire() for _ in range(5)]
+
+        self.assertEqual(waits, [0.0] * 5)
+        self.assertEqual(fake.slept, [])
+
+    def test_over_budget_waits_for_next_token(self):
+        fake = FakeClock()
+        target = TokenBucket(10, 2, fake.clock, fake.sleep)
+
+        target.acquire()
+        target.acquire()
+        actual = target.acquire()
+
+        self.assertAlmostEqual(actual, 0.1)
+
+    def test_idle_gap_refills_bucket(self):
+        fake = FakeClock()
+        target = TokenBucket(10, 1, fake.clock, fake.sleep)
+
+        target.acquire()
+        fake.now += 5
+        actual = target.acquire()
+
+        self.assertEqual(actual, 0.0)
+
+    def test_zero_rate_is_unlimited(self):
+        fake = FakeClock()
+        target = TokenBucket(0, 1, fake.clock, fake.sleep)
+
+        waits = [target.acquire() for _ in range(100)]
+
+        self.assertEqual(sum(waits), 0.0)
+
+    def test_hosts_have_separate_budgets(self):
+        target = RateLimiter(20, 10)
+        target.set_host_limit('https://www.steamgriddb.com/api/v2/', 10, 5)
+
+        api_bucket = target._get_bucket('www.steamgriddb.com')
+        cdn_bucket = target._get_bucket('cdn2.steamgriddb.com')
+
+        self.assertEqual(api_bucket.rate, 10)
+        self.assertEqual(api_bucket.capacity, 5)
+        self.assertEqual(cdn_bucket.rate, 20)
+        self.assertEqual(cdn_bucket.capacity, 10)
+        self.assertIsNot(api_bucket, target._get_bucket('cdn.example.com'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper title helpers.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.titles import normalize_title, strip_title_noise, get_title_key, get_title_year, rank_games
+
+class Test_titles(unittest.TestCase):
+
+    def test_normalize_title_collapses_case_whitespace_and_punctuation(self):
+        self.assertEqual(normalize_title('Sniper Elite III'), 'sniper elite iii')
+        self.assertEqual(normalize_title('  SNIPER-elite:   III!'), 'sniper elite iii')
+        self.assertEqual(normalize_title('Sniper_Elite.III'), 'sniper elite iii')
+
+    def test_strip_title_noise_removes_tags_versions_and_extensions(self):
+        self.assertEqual(strip_title_noise('Sniper Elite III (USA) [!] v1.02.exe'), 'Sniper Elite III')
+        self.assertEqual(strip_title_noise('Final Fantasy VII Rev A'), 'Final Fantasy VII')
+        self.assertEqual(strip_title_noise('Half-Life 2: Episode One'), 'Half-Life 2: Episode One')
+        self.assertEqual(strip_title_noise('(USA).exe'), '(USA).exe')
+
+    def test_get_title_key_writes_roman_numerals_as_digits(self):
+        self.assertEqual(get_title_key('Sniper Elite III (USA).exe'), 'sniper elite 3')
+        self.assertEqual(get_title_key('Sniper Elite 3'), 'sniper elite 3')
+
+    def test_get_title_year(self):
+        self.assertEqual(get_title_year('Doom (1993).zip'), 1993)
+        self.assertIsNone(get_title_year('Doom 2016'))
+
+    def test_rank_games_scores_token_similarity(self):
+        games = [
+            {'id': 1, 'name': 'Sniper Elite', 'release_date': 1096588800},
+            {'id': 3, 'name': 'Sniper Elite V2'},
+            {'id': 2, 'name': 'Sniper Elite 3', 'release_date': 1403568000}
+        ]
+
+        actual = rank_games('Sniper Elite III (USA).exe', games)
+
+        self.assertEqual([game['id'] for game, _ in actual], [2, 1, 3])
+
+    def test_rank_games_stops_at_exact_match(self):
+        games = [
+            {'id': 1, 'name': 'Sniper Elite III', 'release_date': 1403568000},
+            {'id': 2, 'name': 'Sniper Elite III: Ultimate Edition'}
+        ]
+
+        actual = rank_games('Sniper Elite III', games)
+
+        self.assertEqual(actual, [(games[0], 1.0), (games[1], 0.0)])
+
+    def test_rank_games_prefers_matching_year(self):
+        games = [
+            {'id': 1, 'name': 'Doom', 'release_date': 1463097600},
+            {'id': 2, 'name': 'Doom', 'release_date': 755827200}
+        ]
+
+        actual = rank_games('Doom (1993)', games)
+
+        self.assertEqual([game['id'] for game, _ in actual], [2, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/python -B
+# -*- coding: utf-8 -*-
+#
+# Test AKL SteamGridDB scraper HTTP transport and rate limit backoff.
+#
+
+# --- Python standard library ---
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+from resources.lib.throttling import RateLimiter, BackoffGate
+from resources.lib.transport import HttpTransport
+
+from tests.fakes import FakeHTTPServer
+
+class Test_transport(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeHTTPServer().start()
+        self.waits = []
+        self.backoff = BackoffGate(base_delay=0.01, max_delay=0.05, on_wait=self.waits.append)
+        self.target = HttpTransport(RateLimiter(0, 1), self.backoff, headers={'Authorization': 'Bearer abc'},
+                                    max_retries=3)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_get_returns_json_response(self):
+        self.server.add_response('/games/id/1', body={'success': True, 'data': {'id': 1}})
+
+        actual = self.target.get(self.server.get_url('games/id/1'))
+
+        self.assertEqual(actual.status, 200)
+        self.assertEqual(actual.json()['data']['id'], 1)
+        self.assertEqual(self.server.requests[0][1]['Authorization'], 'Bearer abc')
+
+    def test_conditional_request_returns_not_modified(self):
+        self.server.add_response('/games/id/1', 304, {'ETag': '"v1"'})
+
+        actual = self.target.get(self.server.get_url('games/id/1'), {'If-None-Match': '"v1"'})
+
+        self.assertEqual(actual.status, 304)
+        self.assertEqual(self.server.requests[0][1]['If-None-Match'], '"v1"')
+        self.assertEqual(self.server.requests[0][1]['Authorization'], 'Bearer abc')
+
+    def test_429_is_retried_after_retry_after_header(self):
+        self.server.add_response('/grids/game/1', 429, {'Retry-After': '0'})
+        self.server.add_response('/grids/game/1', 200, body={'success': True, 'data': []})
+
+        actual = self.target.get(self.server.get_url('grids/game/1'))
+
+        self.assertEqual(actual.status, 200)
+        self.assertEqual(self.server.count_requests('/grids/game/1'), 2)
+        self.assertEqual(self.waits, [0.0])
+
+    def test_429_not_retried_when_canceled(self):
+        self.backoff.is_canceled = lambda: True
+        self.server.add_response('/grids/game/1', 429, {'Retry-After': '0'})
+
+        actual = self.target.get(self.server.get_url('grids/game/1'))
+
+        self.assertEqual(actual.status, 429)
+        self.assertEqual(self.server.count_requests('/grids/game/1'), 1)
+
+    def test_429_returned_when_retries_are_used(self):
+        self.server.add_response('/grids/game/1', 429)
+
+        actual = self.target.get(self.server.get_url('grids/game/1'))
+
+        self.assertEqual(actual.status, 429)
+        self.assertEqual(self.server.count_requests('/grids/game/1'), 4)
+        self.assertEqual(len(self.waits), 3)
+
+    def test_download_streams_image_to_file(self):
+        self.server.add_response('/file/abc.png', body=b'PNGDATA')
+        target_path = os.path.join(tempfile.mkdtemp(), 'abc.png')
+
+        actual = self.target.download(self.server.get_url('file/abc.png'), target_path)
+
+        self.assertEqual(actual, 7)
+        with open(target_path, 'rb') as f:
+            self.assertEqual(f.read(), b'PNGDATA')
+
+    def test_download_sends_no_api_key(self):
+        self.server.add_response('/cdn/grid/abc.png', body=b'PNGDATA')
+        target_path = os.path.join(tempfile.mkdtemp(), 'abc.png')
+
+        self.target.download(self.server.get_url('cdn/grid/abc.png'), target_path)
+
+        self.assertNotIn('Authorization', self.server.requests[0][1])
+
+    def test_failed_download_leaves_no_file(self):
+        target_path = os.path.join(tempfile.mkdtemp(), 'missing.png')
+
+        actual = self.target.download(self.server.get_url('file/missing.png'), target_path)
+
+        self.assertIsNone(actual)
+        self.assertFalse(os.path.exists(target_path))
+        self.assertFalse(os.path.exists(target_path + '.part'))
+
+    def test_download_many_reports_every_item(self):
+        self.server.add_response('/file/a.png', body=b'AAAA')
+        self.server.add_response('/file/b.png', body=b'BB')
+        target_dir = tempfile.mkdtemp()
+        download_list = [
+            (self.server.get_url('file/a.png'), os.path.join(target_dir, 'a.png')),
+            (self.server.get_url('file/b.png'), os.path.join(target_dir, 'b.png')),
+            (self.server.get_url('file/c.png'), os.path.join(target_dir, 'c.png'))
+        ]
+
+        actual = self.target.download_many(download_list, max_workers=2, max_retries=0)
+
+        self.assertEqual([result.success for result in actual], [True, True, False])
+        self.assertEqual([result.num_bytes for result in actual], [4, 2, None])
+
+    def test_network_error_returns_none(self):
+        url = self.server.get_url('games/id/1')
+        self.server.stop()
+
+        actual = self.target.get(url)
+
+        self.assertIsNone(actual)
+
+class Test_backoff(unittest.TestCase):
+
+    def test_exponential_delay_is_jittered_and_capped(self):
+        target = BackoffGate(base_delay=5, max_delay=60, jitter=lambda: 1.0)
+
+        self.assertEqual(target.get_delay(0, {}), 5)
+        self.assertEqual(target.get_delay(2, {}), 20)
+        self.assertEqual(target.get_delay(10, {}), 60)
+
+    def test_delay_from_headers(self):
+        target = BackoffGate(clock=lambda: 1700000000.0)
+
+        self.assertEqual(target.get_delay(0, {'Retry-After': '30'}), 30)
+        self.assertEqual(target.get_delay(0, {'X-RateLimit-Reset': '1700000045'}), 45)
+        self.assertEqual(target.get_delay(0, {'RateLimit-Reset': '12'}), 12)
+
+    def test_server_delay_is_capped(self):
+        target = BackoffGate(max_delay=60)
+
+        self.assertEqual(target.get_delay(0, {'Retry-After': '3600'}), 60)
+
+    def test_cancel_stops_waiting(self):
+        now = [100.0]
+        slept = []
+        canceled = [False]
+
+        def fake_sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+            if len(slept) == 3: canceled[0] = True
+
+        target = BackoffGate(max_delay=60, clock=lambda: now[0], sleep=fake_sleep, is_canceled=lambda: canceled[0])
+        target.trip(0, {'Retry-After': '30'})
+
+        actual = target.wait()
+
+        self.assertEqual(actual, 3)
+        self.assertTrue(target.canceled())
+
+    def test_trip_pauses_all_waiting_requests(self):
+        now = [100.0]
+        slept = []
+
+        def fake_sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        target = BackoffGate(clock=lambda: now[0], sleep=fake_sleep)
+        target.trip(0, {'Retry-After': '10'})
+
+        first = target.wait()
+        second = target.wait()
+
+        self.assertEqual(first, 10)
+        self.assertEqual(second, 0)
+
+if __name__ == '__main__':
+    unittest.main()